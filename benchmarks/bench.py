@@ -0,0 +1,301 @@
+"""Throughput / latency / memory benchmarks against local stand-in servers.
+
+    python -m benchmarks.bench                       # all scenarios, results in benchmarks/results/
+    python -m benchmarks.bench --scenarios batch,crawl --latency-ms 50 --output run.json
+    python -m benchmarks.bench --compare old.json new.json
+    python -m benchmarks.bench --scenarios import --cold-start-budget-ms 400
+
+Scenarios (each runs in its own process, so peak RSS is per scenario):
+  single   check_url one URL at a time
+  batch    check_urls over many URLs concurrently
+  crawl    crawl_site over several synthetic sites
+  extract  extract_seo_from_html over a corpus of large pages (no network); with
+           --parse-processes N the corpus goes through the engine's parse process pool
+  import   cold starts: fresh interpreters that import app.py and run a first check, timed
+           against --cold-start-budget-ms (what a serverless cold start pays)
+
+Every scenario reports items/sec (URLs, pages or documents), p50/p95/p99 latency in ms and
+peak RSS in MB. The web and the RDAP/WHOISXMLAPI providers are served by benchmarks.mock_servers,
+so runs are repeatable and never touch the internet.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from .mock_servers import MockServer, SyntheticWeb, site_host
+
+SCENARIOS = ('single', 'batch', 'crawl', 'extract', 'import')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return round(values[lo] + (values[hi] - values[lo]) * (k - lo), 3)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(items, seconds, latencies_ms, **extra):
+    return dict({
+        "items": items,
+        "seconds": round(seconds, 3),
+        "items_per_sec": round(items / seconds, 2) if seconds else None,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "peak_rss_mb": peak_rss_mb(),
+    }, **extra)
+
+
+def _web(args):
+    return SyntheticWeb(sites=args.sites, pages=args.pages, links=args.links, page_bytes=args.page_bytes,
+                        latency_ms=args.latency_ms, rdap_latency_ms=args.rdap_latency_ms,
+                        rdap_miss_rate=args.rdap_miss_rate)
+
+
+# --- SCENARIOS (run in a child process) ---
+def run_single(args):
+    import websitechecker
+    urls = _web(args).urls(args.single_urls)
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    for url in urls:
+        t = time.perf_counter()
+        result = websitechecker.check(url)
+        latencies.append((time.perf_counter() - t) * 1000)
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    return summarize(len(urls), time.perf_counter() - start, latencies, statuses=statuses)
+
+
+def run_batch(args):
+    import websitechecker
+    urls = _web(args).urls(args.batch_urls)
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    for _, result in websitechecker.iter_check(urls, args.concurrency, args.per_host):
+        latencies.append(result.get('timings', {}).get('total_ms') or 0)
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    return summarize(len(urls), time.perf_counter() - start, latencies, statuses=statuses,
+                     concurrency=args.concurrency, per_host=args.per_host)
+
+
+def run_crawl(args):
+    import websitechecker
+    latencies = []
+    pages = 0
+    start = time.perf_counter()
+    for site in range(min(args.crawl_sites, args.sites)):
+        t = time.perf_counter()
+        found = websitechecker.crawl(f"http://{site_host(site)}/page/0.html", args.crawl_pages)
+        latencies.append((time.perf_counter() - t) * 1000)
+        pages += len(found)
+    # Latencies here are per crawl, not per page
+    return summarize(pages, time.perf_counter() - start, latencies, crawls=len(latencies))
+
+
+def run_extract(args):
+    import websitechecker
+    web = _web(args)
+    corpus = [web.large_page(n, args.large_page_bytes) for n in range(args.extract_docs)]
+    megabytes = sum(len(doc) for doc in corpus) / 1e6
+    latencies = []
+    if args.parse_processes:
+        seconds = websitechecker.run(_extract_pooled([doc.encode() for doc in corpus], latencies))
+    else:
+        start = time.perf_counter()
+        for doc in corpus:
+            t = time.perf_counter()
+            websitechecker.extract_seo_from_html(doc)
+            latencies.append((time.perf_counter() - t) * 1000)
+        seconds = time.perf_counter() - start
+    return summarize(len(corpus), seconds, latencies, megabytes=round(megabytes, 2),
+                     mb_per_sec=round(megabytes / seconds, 2) if seconds else None)
+
+
+async def _extract_pooled(bodies, latencies):
+    """Parses bodies concurrently through the engine's process pool; returns the wall time."""
+    import asyncio
+    from websitechecker import get_engine
+    from websitechecker.seo import extract_seo_from_bytes
+    engine = get_engine()
+    # Warm the workers up so process start-up isn't counted
+    await asyncio.gather(*(engine.parse(extract_seo_from_bytes, b'<title>x</title>')
+                           for _ in range(engine.parse_processes)))
+
+    async def one(body):
+        t = time.perf_counter()
+        await engine.parse(extract_seo_from_bytes, body)
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(body) for body in bodies))
+    return time.perf_counter() - start
+
+
+# Runs in a fresh interpreter per cold start
+_COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+import websitechecker
+websitechecker.check(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_check_ms": (done - imported) * 1000}))
+"""
+
+
+def run_import(args):
+    url = _web(args).urls(1)[0]
+    imports, first_checks, totals = [], [], []
+    for _ in range(args.cold_starts):
+        proc = subprocess.run([sys.executable, '-c', _COLD_START, url], cwd=ROOT, capture_output=True,
+                              text=True, check=True)
+        timing = json.loads(proc.stdout.strip().splitlines()[-1])
+        imports.append(timing['import_ms'])
+        first_checks.append(timing['first_check_ms'])
+        totals.append(timing['import_ms'] + timing['first_check_ms'])
+    # Latencies are import + first check per cold start; the interpreter's own start-up isn't included
+    p95 = percentile(totals, 95)
+    return summarize(len(totals), sum(totals) / 1000, totals, import_p50_ms=percentile(imports, 50),
+                     import_p95_ms=percentile(imports, 95), first_check_p50_ms=percentile(first_checks, 50),
+                     budget_ms=args.cold_start_budget_ms, within_budget=p95 <= args.cold_start_budget_ms)
+
+
+RUNNERS = {'single': run_single, 'batch': run_batch, 'crawl': run_crawl, 'extract': run_extract,
+           'import': run_import}
+
+
+# --- ORCHESTRATION ---
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_all(args):
+    web = _web(args)
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ('scenario', 'output', 'compare')},
+        "scenarios": {},
+    }
+    with MockServer(web) as server:
+        env = dict(os.environ, **server.env())
+        if args.parse_processes:
+            env['PARSE_PROCESSES'] = str(args.parse_processes)
+        for name in args.scenarios.split(','):
+            print(f"[bench] {name}...", file=sys.stderr)
+            argv = [sys.executable, '-m', 'benchmarks.bench', '--scenario', name] + _forwarded(args)
+            proc = subprocess.run(argv, cwd=ROOT, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                report["scenarios"][name] = {"error": proc.stderr.strip().splitlines()[-1:] or None}
+                continue
+            report["scenarios"][name] = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"[bench] {name}: {json.dumps(report['scenarios'][name])}", file=sys.stderr)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit'] or 'nogit'}-{int(time.time())}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(output)
+    return report
+
+
+def compare(old_path, new_path):
+    """Prints per-scenario throughput and latency changes between two result files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for name, after in new['scenarios'].items():
+        before = old['scenarios'].get(name)
+        if not before or 'error' in before or 'error' in after:
+            continue
+        cells = []
+        for key in ('items_per_sec', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb'):
+            a, b = before.get(key), after.get(key)
+            change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else 'n/a'
+            cells.append(f"{key}={b} ({change})")
+        print(f"  {name:8} " + '  '.join(cells))
+
+
+_FORWARDED = ('sites', 'pages', 'links', 'page_bytes', 'latency_ms', 'rdap_latency_ms', 'rdap_miss_rate',
+              'single_urls', 'batch_urls', 'concurrency', 'per_host', 'crawl_sites', 'crawl_pages',
+              'extract_docs', 'large_page_bytes', 'parse_processes', 'cold_starts', 'cold_start_budget_ms')
+
+
+def _forwarded(args):
+    argv = []
+    for name in _FORWARDED:
+        argv += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    return argv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset of ' +
+                        ', '.join(SCENARIOS))
+    parser.add_argument('--output', help='where to write the JSON report (default benchmarks/results/)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two reports and exit')
+    parser.add_argument('--scenario', choices=SCENARIOS, help=argparse.SUPPRESS)
+    # Synthetic web
+    parser.add_argument('--sites', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=200, help='pages per site')
+    parser.add_argument('--links', type=int, default=8, help='links per page')
+    parser.add_argument('--page-bytes', type=int, default=30_000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='added to every page response')
+    parser.add_argument('--rdap-latency-ms', type=float, default=0.0)
+    parser.add_argument('--rdap-miss-rate', type=float, default=0.2,
+                        help='share of domains RDAP has no record for (they fall back to WHOISXMLAPI)')
+    # Workloads
+    parser.add_argument('--single-urls', type=int, default=50)
+    parser.add_argument('--batch-urls', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--per-host', type=int, default=4)
+    parser.add_argument('--crawl-sites', type=int, default=3)
+    parser.add_argument('--crawl-pages', type=int, default=200)
+    parser.add_argument('--extract-docs', type=int, default=20)
+    parser.add_argument('--large-page-bytes', type=int, default=1_000_000)
+    parser.add_argument('--cold-starts', type=int, default=10)
+    parser.add_argument('--cold-start-budget-ms', type=float, default=500,
+                        help='import app + first check, p95; reported as within_budget')
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='parse in this many worker processes (PARSE_PROCESSES); 0 parses in-process')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.scenario:
+        # Child process: the parent has pointed HTTP_PROXY and the provider URLs at the mock server
+        print(json.dumps(RUNNERS[args.scenario](args)))
+    else:
+        run_all(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Local stand-ins for the internet, for benchmarks.
+
+One threaded HTTP server plays every host: it is used as the HTTP proxy (HTTP_PROXY), so
+requests for http://site3-bench.com/... or the fake RDAP / WHOISXMLAPI hosts all arrive here
+and are routed on the Host header. Nothing leaves the machine.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+RDAP_HOST = 'rdap.bench.test'
+WHOIS_API_HOST = 'whoisxmlapi.bench.test'
+
+
+def site_host(n):
+    # A real-looking public suffix, so check_url accepts it and each site is its own registrable domain
+    return f"site{n}-bench.com"
+
+
+class SyntheticWeb:
+    """Shape of the synthetic sites and providers served by MockServer."""
+
+    def __init__(self, sites=10, pages=200, links=8, page_bytes=30_000, latency_ms=0.0,
+                 rdap_latency_ms=0.0, rdap_miss_rate=0.0, seed=1):
+        self.sites = sites
+        self.pages = pages
+        self.links = links
+        self.page_bytes = page_bytes
+        self.latency_ms = latency_ms
+        self.rdap_latency_ms = rdap_latency_ms
+        self.rdap_miss_rate = rdap_miss_rate
+        self.seed = seed
+        self._page = lru_cache(maxsize=4096)(self._render_page)
+
+    def urls(self, count):
+        """`count` page URLs spread round-robin over the sites."""
+        return [f"http://{site_host(i % self.sites)}/page/{(i // self.sites) % self.pages}.html"
+                for i in range(count)]
+
+    def page(self, site, n):
+        return self._page(site, n)
+
+    def _render_page(self, site, n, page_bytes=None):
+        rng = random.Random(f"{self.seed}-{site}-{n}")
+        # Always link to the next page so a crawl can reach the whole site
+        targets = {(n + 1) % self.pages} | {rng.randrange(self.pages) for _ in range(self.links)}
+        links = ''.join(f'<li><a href="/page/{t}.html?utm_source=bench">Page {t}</a></li>' for t in sorted(targets))
+        head = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Site {site} page {n} - synthetic '
+                f'benchmark page</title><meta name="description" content="Synthetic page {n} of site {site}, '
+                f'used to benchmark the website checker without touching the internet.">'
+                f'<meta property="og:title" content="Page {n}"><meta name="twitter:card" content="summary">'
+                f'<link rel="canonical" href="http://{site_host(site)}/page/{n}.html"></head>')
+        body = [f'<body><h1>Page {n}</h1><ul>{links}</ul>']
+        size = len(head) + len(body[0])
+        target = self.page_bytes if page_bytes is None else page_bytes
+        paragraph = 0
+        while size < target:
+            alt = ' alt="x"' if paragraph % 3 else ''
+            chunk = (f'<div class="p"><p>Paragraph {paragraph} with <b>bold</b> &amp; <i>italic</i> text '
+                     f'{"lorem ipsum dolor sit amet " * rng.randint(3, 12)}</p>'
+                     f'<img src="/img/{paragraph}.png"{alt}></div>')
+            body.append(chunk)
+            size += len(chunk)
+            paragraph += 1
+        body.append('</body></html>')
+        return (head + ''.join(body)).encode()
+
+    def large_page(self, n, page_bytes):
+        """A page of roughly `page_bytes` bytes, for the extraction corpus."""
+        return self._render_page(0, n, page_bytes).decode()
+
+    def rdap(self, domain):
+        if random.Random(f"{self.seed}-rdap-{domain}").random() < self.rdap_miss_rate:
+            return None
+        return {
+            "objectClassName": "domain",
+            "ldhName": domain,
+            "events": [{"eventAction": "registration", "eventDate": "2015-03-01T10:00:00Z"},
+                       {"eventAction": "expiration", "eventDate": "2030-03-01T10:00:00Z"},
+                       {"eventAction": "last changed", "eventDate": "2024-01-15T08:30:00Z"}],
+            "entities": [{"roles": ["registrar"],
+                          "vcardArray": ["vcard", [["version", {}, "text", "4.0"],
+                                                   ["fn", {}, "text", "Bench Registrar, Inc."]]]}],
+        }
+
+    def whois_api(self, domain):
+        return {"WhoisRecord": {"domainName": domain, "registrarName": "Bench API Registrar",
+                                "createdDate": "2016-05-04T00:00:00Z", "expiresDate": "2031-05-04T00:00:00Z",
+                                "updatedDate": "2024-02-02T00:00:00Z"}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        web = self.server.web
+        host = self.headers.get('Host', '').split(':')[0].lower()
+        # Proxied requests carry the absolute URL
+        parts = urlsplit(self.path)
+        path = parts.path
+
+        if host == RDAP_HOST:
+            time.sleep(web.rdap_latency_ms / 1000)
+            data = web.rdap(path.rsplit('/', 1)[-1])
+            if data is None:
+                return self._send(404, b'{}', 'application/rdap+json')
+            return self._send(200, json.dumps(data).encode(), 'application/rdap+json')
+        if host == WHOIS_API_HOST:
+            time.sleep(web.rdap_latency_ms / 1000)
+            domain = parse_qs(parts.query).get('domainName', [''])[0]
+            return self._send(200, json.dumps(web.whois_api(domain)).encode(), 'application/json')
+
+        time.sleep(web.latency_ms / 1000)
+        site = host[len('site'):-len('-bench.com')] if host.endswith('-bench.com') else ''
+        if not site.isdigit() or int(site) >= web.sites:
+            return self._send(404, b'not found')
+        if path == '/robots.txt':
+            return self._send(200, b'User-agent: *\nDisallow: /private/\n', 'text/plain')
+        if path.startswith('/page/') and path.endswith('.html'):
+            n = path[len('/page/'):-len('.html')]
+            if n.isdigit() and int(n) < web.pages:
+                return self._send(200, web.page(int(site), int(n)))
+        return self._send(404, b'not found')
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up early (cancelled lookups, capped body reads) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockServer:
+    """Runs the stand-in server on a background thread; use as a context manager."""
+
+    def __init__(self, web, host='127.0.0.1', port=0):
+        self.web = web
+        self._server = _Server((host, port), _Handler)
+        self._server.web = web
+        self._thread = None
+        self._bootstrap_path = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment for a process that should only talk to this server."""
+        return {
+            'HTTP_PROXY': self.url, 'http_proxy': self.url,
+            'NO_PROXY': '', 'no_proxy': '',
+            'RDAP_URL': f"http://{RDAP_HOST}/",
+            'RDAP_BOOTSTRAP_PATH': self._bootstrap_path,
+            'WHOIS_API_URL': f"http://{WHOIS_API_HOST}/whoisserver/WhoisService",
+            'WHOIS_API_KEY': 'bench',
+            'PYTHON_WHOIS_ENABLED': '0',
+        }
+
+    def start(self):
+        # A fresh local bootstrap file sends every RDAP query to the fake registry
+        fd, self._bootstrap_path = tempfile.mkstemp(prefix='bench-rdap-', suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"publication": "2024-01-01T00:00:00Z",
+                       "services": [[["com", "net", "org"], [f"http://{RDAP_HOST}/"]]]}, f)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='mock-server')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        os.unlink(self._bootstrap_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+ROUTES = ['/check_one', '/check_batch', '/generate_sitemap', '/site_audit', '/check_links', '/jobs']
+
+
+@pytest.mark.parametrize('route', ROUTES)
+@pytest.mark.parametrize('kwargs', [
+    {"data": "url=http://example.com/", "content_type": "application/x-www-form-urlencoded"},
+    {"data": "{not json", "content_type": "application/json"},
+    {"json": ["http://example.com/"]},
+])
+def test_non_object_bodies_are_rejected(client, route, kwargs):
+    response = client.post(route, **kwargs)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('route, body', [
+    ('/check_one', {"url": 42}),
+    ('/generate_sitemap', {"url": ["http://example.com/"]}),
+    ('/site_audit', {"url": {"href": "http://example.com/"}}),
+    ('/check_links', {"url": 1.5}),
+    ('/jobs', {"type": "crawl", "url": 42}),
+])
+def test_non_string_urls_are_rejected(client, route, body):
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'url must be a string'
+
+
+@pytest.mark.parametrize('value', [0, -5])
+def test_batch_concurrency_is_at_least_one(value):
+    _, _, concurrency, per_host = app._batch_params({"urls": ['example.com'], "concurrency": value, "per_host": value})
+    assert concurrency == 1 and per_host == 1
+
+
+def test_batch_concurrency_is_capped():
+    _, _, concurrency, _ = app._batch_params({"urls": ['example.com'], "concurrency": 10 ** 6})
+    assert concurrency == app.BATCH_CONCURRENCY
+
+
+def test_index_page_knows_the_batch_limit(client):
+    assert f"const BATCH_MAX_URLS = {app.BATCH_MAX_URLS};" in client.get('/').get_data(as_text=True)
+
+
+def test_old_sitemap_output_is_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'SITEMAP_OUTPUT_DIR', str(tmp_path))
+    old, recent = tmp_path / 'old', tmp_path / 'recent'
+    for directory in (old, recent):
+        directory.mkdir()
+        (directory / 'sitemap_index.xml').write_text('<sitemapindex/>')
+    stale = time.time() - 3600
+    os.utime(old, (stale, stale))
+    app._prune_sitemap_output(ttl=600)
+    assert not old.exists() and recent.exists()
+
+
+def test_prune_without_output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'SITEMAP_OUTPUT_DIR', str(tmp_path / 'missing'))
+    app._prune_sitemap_output(ttl=0)
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from websitechecker import checker
+from websitechecker.engine import Engine
+from websitechecker.page_cache import PageCache
+
+
+@pytest.fixture
+def site():
+    """A server for one page whose body and validators the test changes; records request headers."""
+    state = {"body": '<title>One</title><h1>One</h1>', "etag": None, "requests": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state['requests'].append(dict(self.headers))
+            if state['etag'] and self.headers.get('If-None-Match') == state['etag']:
+                self.send_response(304)
+                self.send_header('ETag', state['etag'])
+                self.end_headers()
+                return
+            body = state['body'].encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if state['etag']:
+                self.send_header('ETag', state['etag'])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state['url'] = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = PageCache()
+    monkeypatch.setattr(checker, 'page_cache', cache)
+    return cache
+
+
+def _fetch(url, conditional=True):
+    async def fetch():
+        result = {"seo": None, "reused": False}
+        async with Engine() as engine:
+            await checker._fetch_page(url, engine, conditional, result, {})
+        return result
+    return asyncio.run(fetch())
+
+
+def test_304_reuses_the_stored_result(site, cache):
+    site['etag'] = '"v1"'
+    first = _fetch(site['url'])
+    assert first['status'] == 'Working (200)' and not first['reused'] and first['seo']['title'] == 'One'
+    assert cache.get(site['url'])['etag'] == '"v1"'
+
+    site['body'] = '<title>Not served</title>'  # A 304 means the old body still stands
+    second = _fetch(site['url'])
+    assert site['requests'][-1].get('If-None-Match') == '"v1"'
+    assert second['status'] == 'Working (200)' and second['reused'] and second['seo'] == first['seo']
+
+
+def test_unchanged_body_without_validators_is_reused(site, cache, monkeypatch):
+    first = _fetch(site['url'])
+    assert cache.get(site['url'])['body_hash']
+
+    async def no_parse(*args, **kwargs):
+        raise AssertionError("an unchanged body must not be parsed again")
+
+    monkeypatch.setattr(checker, 'read_seo', no_parse)
+    second = _fetch(site['url'])
+    assert 'If-None-Match' not in site['requests'][-1] and 'If-Modified-Since' not in site['requests'][-1]
+    assert second['reused'] and second['seo'] == first['seo']
+
+
+@pytest.mark.parametrize('body', ['<title>Two</title><h1>Two</h1>',  # Same length
+                                  '<title>One</title><h1>One</h1><p>more</p>',  # Longer, same prefix
+                                  '<title>One</title>'])  # Shorter
+def test_changed_body_is_parsed_again(site, cache, body):
+    _fetch(site['url'])
+    site['body'] = body
+    second = _fetch(site['url'])
+    assert not second['reused']
+    assert second['seo'] == checker.extract_seo_from_bytes(body.encode(), 'utf-8', False)
+    assert cache.get(site['url'])['hashed_bytes'] == len(body)
+
+
+def test_without_conditional_nothing_is_stored_or_reused(site, cache):
+    _fetch(site['url'], conditional=False)
+    assert cache.get(site['url']) is None
+    assert not _fetch(site['url'], conditional=False)['reused']
+
+
+class _FakeChecks:
+    """Stands in for check_url: records how many checks run at once, overall and per host."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+        self.started = []
+
+    async def __call__(self, url, engine=None, conditional=None):
+        host = url.split('/')[2]
+        self.started.append(url)
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        self.peak_total = max(self.peak_total, sum(self.active.values()))
+        await asyncio.sleep(self.delays.get(host, 0.01))
+        self.active[host] -= 1
+        if url.endswith('/fail'):
+            raise RuntimeError("boom")
+        return {"url": url, "status": "Working (200)"}
+
+
+def _check_all(urls, monkeypatch, fake, **kwargs):
+    monkeypatch.setattr(checker, 'check_url', fake)
+
+    async def run():
+        engine = types.SimpleNamespace(resolver=None)
+        return [item async for item in checker.check_urls(urls, engine=engine, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_check_urls_respects_per_host_and_concurrency(monkeypatch):
+    urls = [f"http://{host}.test/{n}" for n in range(8) for host in 'abc']
+    fake = _FakeChecks()
+    results = _check_all(urls, monkeypatch, fake, concurrency=4, per_host=2)
+    assert max(fake.peak.values()) == 2 and fake.peak_total == 4
+    # Every URL once, each result under its own index
+    assert sorted(index for index, _ in results) == list(range(len(urls)))
+    assert all(result['url'] == urls[index] for index, result in results)
+
+
+def test_check_urls_round_robins_hosts(monkeypatch):
+    # One big slow host first in the list must not hold back the others
+    urls = [f"http://big.test/{n}" for n in range(20)] + ['http://small.test/1', 'http://other.test/1']
+    fake = _FakeChecks(delays={'big.test': 0.05})
+    results = _check_all(urls, monkeypatch, fake, concurrency=3, per_host=2)
+    assert fake.peak['big.test'] == 2
+    # One check per host before a host gets its second
+    assert fake.started[:3] == ['http://big.test/0', 'http://small.test/1', 'http://other.test/1']
+    finished = [urls[index] for index, _ in results]
+    assert set(finished[:2]) == {'http://small.test/1', 'http://other.test/1'}
+
+
+def test_check_urls_reads_ahead_only_max_queued(monkeypatch):
+    consumed = []
+
+    def source():
+        for n in range(50):
+            consumed.append(n)
+            yield f"http://h{n}.test/"
+
+    fake = _FakeChecks()
+    monkeypatch.setattr(checker, 'check_url', fake)
+
+    async def first():
+        results = checker.check_urls(source(), concurrency=2, engine=types.SimpleNamespace(resolver=None),
+                                     max_queued=10)
+        item = await results.__anext__()
+        await results.aclose()
+        return item
+
+    index, result = asyncio.run(first())
+    assert result['url'] == f"http://h{index}.test/"
+    assert len(consumed) <= 11
+
+
+def test_failed_check_keeps_its_index(monkeypatch):
+    urls = ['http://a.test/1', 'http://a.test/fail', 'http://b.test/2']
+    results = dict(_check_all(urls, monkeypatch, _FakeChecks(), concurrency=3, per_host=1))
+    assert results[1] == {"url": 'http://a.test/fail', "status": "Check Failed", "domain_info": {}, "seo": {},
+                          "duration": "0.00s", "reused": False, "timings": {}}
+    assert results[0]['status'] == results[2]['status'] == 'Working (200)'
@@ -0,0 +1,80 @@
+import json
+
+from websitechecker import cli
+from websitechecker.cli import Checkpoint, main
+from websitechecker.health import HostHealth
+
+
+def test_checkpoint_tracks_out_of_order_completion(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'cp'), str(tmp_path / 'in.txt'))
+    for n in (1, 2, 0, 5):
+        checkpoint.mark(n)
+    assert checkpoint.position == 3 and checkpoint.done == {5}
+    checkpoint.save(123)
+
+    loaded = Checkpoint(str(tmp_path / 'cp'), str(tmp_path / 'in.txt'))
+    assert loaded.load()
+    assert (loaded.position, loaded.done, loaded.output_bytes) == (3, {5}, 123)
+    assert loaded.is_done(2) and loaded.is_done(5) and not loaded.is_done(3)
+    # A checkpoint for another input file isn't used
+    assert not Checkpoint(str(tmp_path / 'cp'), str(tmp_path / 'other.txt')).load()
+
+
+def test_resume_writes_every_url_exactly_once(tmp_path):
+    # 127.0.0.1 has no registrable domain, so these checks finish without network access
+    urls = [f"http://127.0.0.1/page{i}" for i in range(20)]
+    source = tmp_path / 'urls.txt'
+    source.write_text('# portfolio\n\n' + '\n'.join(urls) + '\n')
+    output = tmp_path / 'out.jsonl'
+
+    # An interrupted run: 5 URLs done and checkpointed, then a torn line written after the checkpoint
+    done = [json.dumps({"index": n, "url": urls[n], "status": "Invalid Domain"}) + '\n' for n in range(5)]
+    output.write_text(''.join(done) + '{"index": 7, "url": "http://127.0')
+    checkpoint = Checkpoint(str(output) + '.checkpoint', str(source))
+    for n in range(5):
+        checkpoint.mark(n)
+    checkpoint.save(len(''.join(done).encode()))
+
+    assert main(['check', str(source), '-o', str(output)]) == 0
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(row['index'] for row in rows) == list(range(20))
+    assert {row['index']: row['url'] for row in rows} == dict(enumerate(urls))
+
+    # Finished: running again checks nothing and leaves the output alone
+    assert main(['check', str(source), '-o', str(output)]) == 0
+    assert len(output.read_text().splitlines()) == 20
+
+
+def test_stdout_stays_clean_for_results(tmp_path, capsys):
+    health = HostHealth(threshold=1)
+    health.failure('example.com')
+    source = tmp_path / 'urls.txt'
+    source.write_text('http://127.0.0.1/a\n')
+    assert main(['check', str(source)]) == 0
+    captured = capsys.readouterr()
+    assert [json.loads(line)['url'] for line in captured.out.splitlines()] == ['http://127.0.0.1/a']
+    assert '[health]' in captured.err
+
+
+def test_interrupted_write_is_not_duplicated_on_resume(tmp_path, monkeypatch):
+    urls = [f"http://127.0.0.1/page{i}" for i in range(10)]
+    source = tmp_path / 'urls.txt'
+    source.write_text('\n'.join(urls) + '\n')
+    output = tmp_path / 'out.jsonl'
+    monkeypatch.setattr(cli, 'CLI_CHECKPOINT_INTERVAL', 0)
+    write = cli.ResultWriter.write
+    rows = []
+
+    def interrupted_write(self, n, url, result):
+        write(self, n, url, result)
+        rows.append(n)
+        if len(rows) == 4:
+            raise KeyboardInterrupt  # ^C after the row is written, before it is marked done
+
+    monkeypatch.setattr(cli.ResultWriter, 'write', interrupted_write)
+    assert main(['check', str(source), '-o', str(output)]) == 130
+    monkeypatch.setattr(cli.ResultWriter, 'write', write)
+
+    assert main(['check', str(source), '-o', str(output)]) == 0
+    indices = [json.loads(line)['index'] for line in output.read_text().splitlines()]
+    assert sorted(indices) == list(range(10))
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from websitechecker import crawler
+from websitechecker.crawler import _extract_links, _internal_links, _targets, iter_crawl, normalize_url
+from websitechecker.engine import Engine
+
+
+def test_normalize_url():
+    assert normalize_url('HTTP://Example.COM:80/a/?utm_source=x&b=2&a=1#top') == 'http://example.com/a?a=1&b=2'
+    assert normalize_url('https://example.com:443/') == 'https://example.com/'
+    assert normalize_url('https://example.com:8443') == 'https://example.com:8443/'
+    assert normalize_url('http://[::1]:8080/x/') == 'http://[::1]:8080/x'
+
+
+def test_unparsable_links_are_skipped():
+    links = ['http://host:99999/x', 'http://[::1/x', 'http://example.com/ok/', 'mailto:a@b.c']
+    assert _internal_links(links, {'example.com'}) == ['http://example.com/ok']
+    # Link checking reports the bad port as a broken target rather than dropping it
+    assert _targets(links, [('img', 'http://host:99999/i.png')]) == [
+        ['a', 'http://host:99999/x'], ['a', 'http://example.com/ok/'], ['img', 'http://host:99999/i.png']]
+
+
+def test_extract_links():
+    html = '<a href="/a">a</a><a name="top"></a><a href="b?q=1#f">b</a><a href="http://[::1/c">c</a><a href="../d"'
+    assert _extract_links(html, 'http://h.test/dir/') == ['http://h.test/a', 'http://h.test/dir/b?q=1#f']
+
+
+def _crawl(start_url, **kwargs):
+    async def crawl():
+        async with Engine() as engine:
+            return [page async for page in iter_crawl(start_url, engine=engine, **kwargs)]
+    return asyncio.run(crawl())
+
+
+def test_crawl_survives_bad_links(serve):
+    base = serve({
+        'index.html': '<a href="http://127.0.0.1:99999/x">bad port</a><a href="http://[::1/y">bad host</a>'
+                      '<a href="/b.html">b</a>',
+        'b.html': '<a href="/">home</a>',
+    })
+    pages = _crawl(base + '/', max_pages=10, concurrency=1, time_budget=20)
+    assert sorted(page['url'] for page in pages) == [base + '/', base + '/b.html']
+    assert all(page['status'] == 200 for page in pages)
+
+
+@pytest.fixture
+def redirect_to():
+    """redirect_to(base) -> URL of a server on another port that redirects every request to base."""
+    servers = []
+
+    def start(base):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(301)
+                self.send_header('Location', base + self.path)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_crawl_follows_start_page_redirect_to_another_host(serve, redirect_to):
+    base = serve({
+        'index.html': '<a href="/a.html">a</a><a href="b.html">b</a>',
+        'a.html': '<a href="/">home</a>',
+        'b.html': '<a href="/a.html">a</a>',
+    })
+    pages = _crawl(redirect_to(base) + '/', max_pages=10, concurrency=1, time_budget=20, seo=True)
+    assert len(pages) == 3
+    assert sorted(page['url'] for page in pages[1:]) == [base + '/a.html', base + '/b.html']
+    assert pages[0]['links'] == [base + '/a.html', base + '/b.html']
+
+
+def test_crawl_reads_bounded_html_only(serve, monkeypatch):
+    monkeypatch.setattr(crawler, 'CRAWL_MAX_BODY_BYTES', 200)
+    base = serve({
+        'index.html': '<a href="/near.html">near</a><a href="/file.bin">bin</a>' + ' ' * 500
+                      + '<a href="/far.html">far</a>',
+        'near.html': 'near', 'far.html': 'far', 'file.bin': 'x' * 10000,
+    })
+    pages = _crawl(base + '/', max_pages=10, concurrency=1, time_budget=20)
+    assert sorted(page['url'] for page in pages) == [base + '/', base + '/file.bin', base + '/near.html']
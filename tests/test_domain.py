@@ -0,0 +1,80 @@
+import asyncio
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+
+from websitechecker import domain
+from websitechecker.domain_cache import DomainCache
+from websitechecker.engine import Engine
+
+
+def test_python_whois_runs_off_the_engine_threads(monkeypatch):
+    threads = []
+
+    def whois(name):
+        threads.append(threading.current_thread().name)
+        return types.SimpleNamespace(registrar='Registrar', creation_date=[datetime(2000, 1, 2)],
+                                     expiration_date=datetime(2030, 1, 2), updated_date=None)
+
+    monkeypatch.setitem(sys.modules, 'whois', types.SimpleNamespace(whois=whois))
+
+    async def lookup():
+        async with Engine() as engine:
+            return await domain._whois_lookup('example.com', engine)
+
+    info = asyncio.run(lookup())
+    assert info == {"domain": 'example.com', "registrar": 'Registrar', "registered_on": '2000-01-02 00:00:00',
+                    "expires_on": '2030-01-02 00:00:00', "updated_on": 'Unknown'}
+    assert threads[0].startswith('websitechecker-whois')
+
+
+def test_expired_rows_are_deleted_from_the_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'domains.sqlite3')
+    DomainCache(path=path, ttl=-1, negative_ttl=-1).set('old.test', {"registrar": 'Old'})
+    now = [time.time()]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    cache = DomainCache(path=path, negative_ttl=10, purge_interval=60)
+
+    def stored():
+        return [row[0] for row in cache._connection().execute('SELECT domain FROM domain_info ORDER BY domain')]
+
+    cache.set('new.test', {"registrar": 'New'})  # first write after opening
+    assert stored() == ['new.test']
+    cache.set('failed.test', None)
+    now[0] += 11
+    cache.set('later.test', {"registrar": 'Later'})  # within purge_interval: kept
+    assert stored() == ['failed.test', 'later.test', 'new.test']
+    now[0] += 50
+    cache.set('last.test', {"registrar": 'Last'})
+    assert stored() == ['last.test', 'later.test', 'new.test']
+
+
+def test_sqlite_cache_is_read_and_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    class RecordingCache(DomainCache):
+        def get(self, name):
+            threads.append(threading.current_thread())
+            return super().get(name)
+
+        def set(self, name, value):
+            threads.append(threading.current_thread())
+            super().set(name, value)
+
+    async def lookup_uncached(name, engine):
+        return {"registrar": 'Registrar'}
+
+    cache = RecordingCache(path=str(tmp_path / 'domains.sqlite3'))
+    monkeypatch.setattr(domain, 'domain_cache', cache)
+    monkeypatch.setattr(domain, '_lookup_uncached', lookup_uncached)
+
+    async def resolve():
+        async with Engine() as engine:
+            return await domain.resolve_domain_info('example.com', engine)
+
+    assert asyncio.run(resolve()) == {"registrar": 'Registrar'}  # miss: SQLite read, then write
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    assert asyncio.run(resolve()) == {"registrar": 'Registrar'}  # in memory: no SQLite
+    assert len(threads) == 2
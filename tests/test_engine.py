@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+import pytest
+
+from websitechecker.dns import UnresolvedHost
+from websitechecker.engine import Engine
+from websitechecker.health import HostHealth
+
+
+def test_unresolvable_host_is_not_retried_nor_held_against_it():
+    health = HostHealth(threshold=1)
+    lookups = []
+
+    async def get():
+        async with Engine(health=health, retries=3) as engine:
+            if engine.resolver is None:
+                pytest.skip("a proxy is configured, so the engine doesn't resolve")
+            engine.resolver.cache.set('nx.test', None, 60)
+            resolve = engine.resolver.resolve
+
+            async def counting_resolve(host):
+                lookups.append(host)
+                return await resolve(host)
+
+            engine.resolver.resolve = counting_resolve
+            with pytest.raises(UnresolvedHost) as raised:
+                await engine.get('http://nx.test/')
+            return raised.value
+
+    error = asyncio.run(get())
+    assert isinstance(error, httpx.ConnectError)  # Still an ordinary httpx error to callers
+    assert lookups == ['nx.test']
+    assert not health.is_open('nx.test')
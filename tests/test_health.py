@@ -0,0 +1,102 @@
+import pytest
+
+from websitechecker import health
+from websitechecker.health import HostHealth, HostUnavailable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.monotonic() as seen by health.py."""
+    now = [1000.0]
+    monkeypatch.setattr(health.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_circuit_opens_after_threshold_consecutive_failures(clock):
+    hosts = HostHealth(threshold=3)
+    hosts.failure('a.test')
+    hosts.failure('a.test')
+    hosts.success('a.test', 0.1)  # Resets the count
+    hosts.failure('a.test')
+    hosts.failure('a.test')
+    assert not hosts.is_open('a.test') and hosts.acquire('a.test') is False
+    hosts.failure('a.test')
+    assert hosts.is_open('a.test')
+    with pytest.raises(HostUnavailable):
+        hosts.acquire('a.test')
+    assert hosts.acquire('b.test') is False  # Other hosts aren't affected
+
+
+def test_half_open_probe_closes_on_success(clock):
+    hosts = HostHealth(threshold=1)
+    hosts.failure('a.test')
+    clock[0] += health.HOST_OPEN_SECONDS - 1
+    with pytest.raises(HostUnavailable):
+        hosts.acquire('a.test')
+    clock[0] += 1
+    assert hosts.acquire('a.test') is True  # The one probe
+    with pytest.raises(HostUnavailable):
+        hosts.acquire('a.test')  # Nothing else while it's out
+    hosts.success('a.test', 0.2)
+    assert not hosts.is_open('a.test') and hosts.acquire('a.test') is False
+
+
+def test_failed_probe_reopens_for_twice_as_long_up_to_the_max(clock):
+    hosts = HostHealth(threshold=1)
+    hosts.failure('a.test')
+    open_seconds = health.HOST_OPEN_SECONDS
+    for _ in range(10):
+        clock[0] += open_seconds
+        assert hosts.acquire('a.test') is True
+        hosts.failure('a.test')
+        open_seconds = min(open_seconds * 2, health.HOST_OPEN_MAX_SECONDS)
+        clock[0] += open_seconds - 1
+        with pytest.raises(HostUnavailable):
+            hosts.acquire('a.test')
+        clock[0] += 1
+    assert open_seconds == health.HOST_OPEN_MAX_SECONDS
+    # Closing resets the open time
+    assert hosts.acquire('a.test') is True
+    hosts.success('a.test', 0.1)
+    hosts.failure('a.test')
+    clock[0] += health.HOST_OPEN_SECONDS
+    assert hosts.acquire('a.test') is True
+
+
+def test_released_probe_lets_the_next_one_through(clock):
+    hosts = HostHealth(threshold=1)
+    hosts.failure('a.test')
+    clock[0] += health.HOST_OPEN_SECONDS
+    assert hosts.acquire('a.test') is True
+    hosts.release('a.test')  # e.g. cancelled
+    assert hosts.acquire('a.test') is True
+
+
+def test_adaptive_timeout():
+    hosts = HostHealth()
+    assert hosts.timeout('a.test', 10) == 10  # No samples yet
+    for _ in range(health.ADAPTIVE_TIMEOUT_SAMPLES - 1):
+        hosts.success('a.test', 1.0)
+    assert hosts.timeout('a.test', 10) == 10  # Not enough samples
+    hosts.success('a.test', 1.0)
+    assert hosts.timeout('a.test', 10) == pytest.approx(1.0 * health.ADAPTIVE_TIMEOUT_MULTIPLIER)
+    # Never above the caller's timeout, never below the minimum
+    assert hosts.timeout('a.test', 2.5) == 2.5
+    fast = HostHealth()
+    for _ in range(20):
+        fast.success('b.test', 0.01)
+    assert fast.timeout('b.test', 10) == health.ADAPTIVE_TIMEOUT_MIN
+    # Non-numeric timeouts (httpx.Timeout objects, None) are passed through
+    assert hosts.timeout('a.test', None) is None
+
+
+def test_adaptive_timeout_uses_the_p95():
+    hosts = HostHealth()
+    for _ in range(19):
+        hosts.success('a.test', 0.5)
+    hosts.success('a.test', 5.0)  # One outlier in 20 is the p95
+    assert hosts.timeout('a.test', 60) == pytest.approx(5.0 * health.ADAPTIVE_TIMEOUT_MULTIPLIER)
+    for _ in range(30):
+        hosts.success('a.test', 0.5)  # ...until it leaves the window
+    assert hosts.timeout('a.test', 60) == pytest.approx(max(health.ADAPTIVE_TIMEOUT_MIN,
+                                                            0.5 * health.ADAPTIVE_TIMEOUT_MULTIPLIER))
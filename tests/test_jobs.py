@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from websitechecker import jobs
+from websitechecker.engine import iterate
+
+
+def _items(params, idle=None):
+    for url in params['urls']:
+        yield {"url": url}
+
+
+def _slow_items(params, idle=None):
+    """The first URL right away, then nothing for a long time."""
+    async def produce():
+        yield {"url": params['urls'][0]}
+        await asyncio.sleep(30)
+        yield {"url": params['urls'][1]}
+    return iterate(produce(), idle=idle)
+
+
+class FlakyStore(jobs.JobStore):
+    """A job store whose listed methods raise "database is locked" on their first call."""
+
+    def __init__(self, path, flaky):
+        super().__init__(path)
+        self.flaky = set(flaky)
+
+    def _fail_once(self, name):
+        if name in self.flaky:
+            self.flaky.discard(name)
+            raise sqlite3.OperationalError('database is locked')
+
+    def claim(self):
+        self._fail_once('claim')
+        return super().claim()
+
+    def finish(self, job_id, status, error=None):
+        self._fail_once('finish')
+        super().finish(job_id, status, error)
+
+
+@pytest.fixture(autouse=True)
+def fake_runner(monkeypatch):
+    monkeypatch.setitem(jobs.RUNNERS, 'check', _items)
+    monkeypatch.setattr(jobs, 'jittered_backoff', lambda attempt: 0.01)
+    monkeypatch.setattr(jobs, 'JOB_POLL_INTERVAL', 0.05)
+
+
+def _wait(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in jobs.FINISHED:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job still {job['status']}")
+
+
+@pytest.mark.parametrize('flaky', [('claim',), ('finish',), ('claim', 'finish')])
+def test_worker_survives_store_errors(tmp_path, flaky):
+    queue = jobs.JobQueue(FlakyStore(str(tmp_path / 'jobs.sqlite3'), flaky), workers=1)
+    first = _wait(queue, queue.submit('check', {"urls": ['http://a.test/', 'http://b.test/']}))
+    assert first['status'] == 'done'
+    assert [item for _, item in queue.results(first['id'])] == [{"url": 'http://a.test/'}, {"url": 'http://b.test/'}]
+    # The same (only) worker is still there for the next job
+    assert _wait(queue, queue.submit('check', {"urls": ['http://c.test/']}))['status'] == 'done'
+
+
+def test_bad_params_fail_the_job(tmp_path):
+    queue = jobs.JobQueue(jobs.JobStore(str(tmp_path / 'jobs.sqlite3')), workers=1)
+    job_id = queue.store.create('check', {})  # no "urls"
+    queue.start()
+    job = _wait(queue, job_id)
+    assert job['status'] == 'failed' and 'urls' in job['error']
+
+
+def test_results_and_cancellation_dont_wait_for_the_next_item(tmp_path, monkeypatch):
+    monkeypatch.setitem(jobs.RUNNERS, 'check', _slow_items)
+    monkeypatch.setattr(jobs, 'JOB_FLUSH_INTERVAL', 0.1)
+    queue = jobs.JobQueue(jobs.JobStore(str(tmp_path / 'jobs.sqlite3')), workers=1)
+    job_id = queue.submit('check', {"urls": ['http://a.test/', 'http://b.test/']})
+    deadline = time.monotonic() + 5
+    while not queue.results(job_id) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert [item for _, item in queue.results(job_id)] == [{"url": 'http://a.test/'}]
+    queue.cancel(job_id)
+    assert _wait(queue, job_id, timeout=5)['status'] == 'cancelled'
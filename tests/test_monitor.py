@@ -0,0 +1,84 @@
+import pytest
+
+from websitechecker.monitor import diff
+from websitechecker.results import CheckResult, DomainInfo, SeoInfo
+
+NOW = 1_800_000_000.0
+DAY = 86400
+URL = 'https://example.com/'
+THRESHOLDS = [30, 7, 1]
+
+
+def _previous(status='Working (200)', seo_score=80, expires_on=NOW + 365 * DAY, expiry_alert=None):
+    return {"url": URL, "status": status, "seo_score": seo_score, "expires_on": expires_on,
+            "expiry_alert": expiry_alert}
+
+
+def _result(status='Working (200)', seo_score=80, expires_on=NOW + 365 * DAY):
+    return CheckResult(url=URL, status=status, seo=None if seo_score is None else SeoInfo(seo_score=seo_score),
+                       domain=DomainInfo(domain='example.com', expires_on=expires_on))
+
+
+def _diff(previous, result, seo_delta=1):
+    return diff(previous, result, NOW, expiry_days=THRESHOLDS, seo_delta=seo_delta)
+
+
+def test_unchanged_result_has_no_events():
+    assert _diff(_previous(), _result()) == ([], None)
+
+
+def test_first_check_only_records_the_baseline():
+    baseline = _previous(status=None, seo_score=None, expires_on=None)
+    assert _diff(baseline, _result(status='Not Working')) == ([], None)
+    # ...except for an expiry alert, which is worth sending straight away
+    events, alert = _diff(baseline, _result(expires_on=NOW + 5 * DAY))
+    assert [event['type'] for event in events] == ['domain_expiring'] and alert == 7
+
+
+def test_status_changed():
+    events, _ = _diff(_previous(), _result(status='Not Working'))
+    assert events == [{"type": "status_changed", "url": URL, "old": 'Working (200)', "new": 'Not Working', "at": NOW}]
+
+
+def test_seo_score_changed_respects_the_delta():
+    events, _ = _diff(_previous(seo_score=80), _result(seo_score=75))
+    assert events == [{"type": "seo_score_changed", "url": URL, "old": 80, "new": 75, "at": NOW}]
+    assert _diff(_previous(seo_score=80), _result(seo_score=84), seo_delta=5)[0] == []
+    assert len(_diff(_previous(seo_score=80), _result(seo_score=85), seo_delta=5)[0]) == 1
+    # A page that couldn't be scored this time isn't a change
+    assert _diff(_previous(seo_score=80), _result(seo_score=None))[0] == []
+
+
+def test_expiry_changed_resets_the_alert():
+    events, alert = _diff(_previous(expires_on=NOW + 5 * DAY, expiry_alert=7), _result(expires_on=NOW + 370 * DAY))
+    assert [event['type'] for event in events] == ['expiry_changed'] and alert is None
+    assert events[0]['old'] == '2027-01-20' and events[0]['new'] == '2028-01-20'
+
+
+def test_failed_domain_lookup_keeps_what_was_known():
+    result = _result()
+    result.domain = None
+    assert _diff(_previous(expiry_alert=30), result) == ([], 30)
+
+
+@pytest.mark.parametrize('days_left, alert', [
+    (31, None), (30.01, None), (30, 30), (29, 30), (7.5, 30), (7, 7), (1.01, 7), (1, 1), (0, 1), (-3, 1),
+])
+def test_expiry_threshold_boundaries(days_left, alert):
+    events, new_alert = _diff(_previous(expires_on=NOW + days_left * DAY), _result(expires_on=NOW + days_left * DAY))
+    assert new_alert == alert
+    if alert is None:
+        assert events == []
+    else:
+        assert events == [{"type": "domain_expiring", "url": URL, "domain": 'example.com',
+                           "expires_on": events[0]['expires_on'], "days_left": round(days_left, 1),
+                           "threshold": alert, "at": NOW}]
+
+
+def test_each_threshold_fires_once():
+    expires_on = NOW + 20 * DAY
+    assert _diff(_previous(expires_on=expires_on, expiry_alert=30), _result(expires_on=expires_on)) == ([], 30)
+    # Jumping past several thresholds at once sends one event, for the nearest
+    events, alert = _diff(_previous(expires_on=NOW + 0.5 * DAY, expiry_alert=30), _result(expires_on=NOW + 0.5 * DAY))
+    assert [event['threshold'] for event in events] == [1] and alert == 1
+    assert _diff(_previous(expires_on=NOW + 0.5 * DAY, expiry_alert=1), _result(expires_on=NOW + 0.5 * DAY))[0] == []
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from websitechecker import rdap
+
+
+@pytest.fixture
+def bootstrapper(tmp_path, monkeypatch):
+    refreshes = []
+
+    async def refresh(self, engine):
+        refreshes.append(engine)
+        self._refreshing = None
+
+    monkeypatch.setattr(rdap, 'RDAP_BOOTSTRAP_PATH', str(tmp_path / 'rdap-dns.json'))
+    monkeypatch.setattr(rdap._Bootstrapper, '_refresh', refresh)
+    bootstrapper = rdap._Bootstrapper()
+
+    async def get():
+        table = bootstrapper.get(engine=None)
+        await asyncio.sleep(0)
+        return table, len(refreshes)
+
+    return lambda: asyncio.run(get())
+
+
+def test_bundled_subset_is_never_fresh(bootstrapper):
+    with open(rdap.RDAP_BOOTSTRAP_SNAPSHOT) as f:
+        snapshot = json.load(f)
+    assert snapshot['subset'] is True and snapshot['publication'] is None
+    table, refreshes = bootstrapper()
+    assert table.subset and table.base_url('example.com') and refreshes == 1
+
+
+@pytest.mark.parametrize('data, fresh', [
+    ({"publication": "2026-01-01T00:00:00Z", "services": [[["com"], ["https://rdap.test/"]]]}, True),
+    ({"services": [[["com"], ["https://rdap.test/"]]]}, False),
+    ({"publication": "2026-01-01T00:00:00Z", "subset": True, "services": [[["com"], ["https://rdap.test/"]]]},
+     False),
+])
+def test_local_copy_freshness(bootstrapper, data, fresh):
+    with open(rdap.RDAP_BOOTSTRAP_PATH, 'w') as f:
+        json.dump(data, f)
+    table, refreshes = bootstrapper()
+    assert table.base_url('example.com') == 'https://rdap.test/'
+    assert refreshes == (0 if fresh else 1)
+
+
+def test_old_local_copy_is_refreshed(bootstrapper):
+    with open(rdap.RDAP_BOOTSTRAP_PATH, 'w') as f:
+        json.dump({"publication": "2026-01-01T00:00:00Z", "services": [[["com"], ["https://rdap.test/"]]]}, f)
+    stale = os.path.getmtime(rdap.RDAP_BOOTSTRAP_PATH) - rdap.RDAP_BOOTSTRAP_TTL - 60
+    os.utime(rdap.RDAP_BOOTSTRAP_PATH, (stale, stale))
+    assert bootstrapper()[1] == 1
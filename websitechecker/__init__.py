@@ -0,0 +1,108 @@
+"""Website checking library used by the Flask app.
+
+The checks are coroutines sharing one connection-pooled HTTP client per event loop:
+
+    async with Engine() as engine:
+        result = await check_url("https://example.com", engine)
+
+Synchronous callers (Flask routes, plain scripts) use the wrappers below, which run the
+coroutines on a shared background event loop:
+
+    results = check_many(["https://example.com", "https://example.org"])
+
+Submodules are imported on first use of a name (`import websitechecker` loads neither httpx
+nor the parsers), which keeps cold starts cheap.
+"""
+import importlib
+
+# Eager (and light): these modules share their name with the instance they export
+from .domain_cache import DomainCache, domain_cache
+from .page_cache import PageCache, page_cache
+
+# Public name -> submodule it lives in
+_EXPORTS = {
+    'SiteAudit': 'site_audit', 'audit_site': 'site_audit', 'iter_audit': 'site_audit',
+    'CHECK_CONCURRENCY': 'checker', 'CHECK_PER_HOST': 'checker', 'check_url': 'checker', 'check_urls': 'checker',
+    'crawl_site': 'crawler', 'iter_crawl': 'crawler', 'normalize_url': 'crawler',
+    'get_domain_info': 'domain', 'lookup_domain': 'domain', 'registrable_domain': 'domain',
+    'resolve_domain_info': 'domain',
+    'Engine': 'engine', 'get_engine': 'engine', 'iterate': 'engine', 'run': 'engine',
+    'LinkChecker': 'linkcheck', 'check_links': 'linkcheck', 'iter_link_check': 'linkcheck', 'probe_link': 'linkcheck',
+    'Monitor': 'monitor', 'MonitorStore': 'monitor',
+    'JobQueue': 'jobs', 'JobStore': 'jobs', 'job_queue': 'jobs',
+    'RdapClient': 'rdap', 'get_rdap_client': 'rdap',
+    'CheckResult': 'results', 'ColumnarWriter': 'results', 'DomainInfo': 'results', 'SeoInfo': 'results',
+    'SeoParser': 'seo', 'extract_seo_from_html': 'seo', 'get_seo_grade': 'seo',
+}
+
+__all__ = sorted(_EXPORTS) + ['DomainCache', 'PageCache', 'audit', 'check', 'check_many', 'crawl', 'domain_cache', 'domain_info',
+                              'iter_check', 'link_check', 'page_cache']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def check(url, conditional=None):
+    """Synchronous check_url."""
+    from .checker import check_url
+    from .engine import run
+    return run(check_url(url, conditional=conditional))
+
+
+def iter_check(urls, concurrency=None, per_host=None, conditional=None, compact=False):
+    """Synchronous check_urls: yields (index, result) in completion order.
+
+    concurrency and per_host default to CHECK_CONCURRENCY and CHECK_PER_HOST; compact=True
+    yields CheckResult objects instead of dicts.
+    """
+    from .checker import CHECK_CONCURRENCY, CHECK_PER_HOST, check_urls
+    from .engine import iterate
+    return iterate(check_urls(urls, concurrency or CHECK_CONCURRENCY, per_host or CHECK_PER_HOST,
+                              conditional=conditional, compact=compact))
+
+
+def check_many(urls, concurrency=None, per_host=None, conditional=None, compact=False):
+    """Checks many URLs concurrently and returns the results in input order."""
+    urls = list(urls)
+    results = [None] * len(urls)
+    for index, result in iter_check(urls, concurrency, per_host, conditional, compact):
+        results[index] = result
+    return results
+
+
+def crawl(start_url, max_pages=50, max_depth=None, time_budget=None):
+    """Synchronous crawl_site."""
+    from .crawler import crawl_site
+    from .engine import run
+    return run(crawl_site(start_url, max_pages, max_depth, time_budget))
+
+
+def audit(start_url, max_pages=50, max_depth=None, time_budget=None):
+    """Synchronous audit_site."""
+    from .site_audit import audit_site
+    from .engine import run
+    return run(audit_site(start_url, max_pages, max_depth, time_budget))
+
+
+def link_check(start_url, max_pages=1, max_depth=None, time_budget=None):
+    """Synchronous check_links."""
+    from .linkcheck import check_links
+    from .engine import run
+    return run(check_links(start_url, max_pages, max_depth, time_budget))
+
+
+def domain_info(raw):
+    """Synchronous get_domain_info."""
+    from .domain import get_domain_info
+    from .engine import run
+    return run(get_domain_info(raw))
@@ -0,0 +1,27 @@
+import os
+import sqlite3
+
+
+class SqliteConnection:
+    """The SQLite connection of a store (caches, jobs, monitor), called to get it.
+
+    Opened on first use, in autocommit mode with WAL (so worker processes on the host can share
+    the file), running `schema` (CREATE ... IF NOT EXISTS statements) once per connection. A
+    connection can't be used across a fork (gunicorn preload), so a forked child opens its own.
+    """
+
+    def __init__(self, path, schema=(), timeout=5):
+        self.path = path
+        self.schema = tuple(schema)
+        self.timeout = timeout
+        self._db = None
+        self._pid = None
+
+    def __call__(self):
+        if self._db is None or self._pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            for statement in self.schema:
+                db.execute(statement)
+            self._db, self._pid = db, os.getpid()
+        return self._db
@@ -0,0 +1,12 @@
+import os
+import random
+
+# Jittered exponential backoff between retries (HTTP requests, store writes); no third-party
+# imports, so light modules (jobs) can use it without pulling in httpx
+RETRY_BACKOFF_BASE = float(os.getenv('RETRY_BACKOFF_BASE', '0.25'))
+RETRY_BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', '5'))
+
+
+def jittered_backoff(attempt, base=RETRY_BACKOFF_BASE, maximum=RETRY_BACKOFF_MAX):
+    """Exponential backoff for the given retry attempt (0, 1, ...), with +/-50% jitter."""
+    return min(base * 2 ** attempt * random.uniform(0.5, 1.5), maximum)
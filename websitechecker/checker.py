@@ -0,0 +1,392 @@
+import asyncio
+import codecs
+import hashlib
+import os
+import sys
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+from .dns import DnsError
+from .health import HostUnavailable
+from .domain import lookup_domain
+from . import metrics
+from .engine import get_engine
+from .page_cache import page_cache
+from .psl import split_host
+from .results import STAGES, CheckResult
+from .seo import SeoParser, empty_seo, extract_seo_from_bytes
+
+CHECK_TIMEOUT = float(os.getenv('CHECK_TIMEOUT', '10'))
+# Upper bound on HTML downloaded per check
+CHECK_MAX_BODY_BYTES = int(os.getenv('CHECK_MAX_BODY_BYTES', str(2 * 1024 * 1024)))
+# Stop reading once </head> is parsed (h1 and image stats are then left empty)
+SEO_HEAD_ONLY = os.getenv('SEO_HEAD_ONLY', '').lower() in ('1', 'true', 'yes')
+# Re-check using the last ETag/Last-Modified/body hash seen for each URL (see page_cache)
+CHECK_CONDITIONAL = os.getenv('CHECK_CONDITIONAL', '').lower() in ('1', 'true', 'yes')
+# Default concurrency for check_urls (overall, and per host)
+CHECK_CONCURRENCY = int(os.getenv('CHECK_CONCURRENCY', '100'))
+CHECK_PER_HOST = int(os.getenv('CHECK_PER_HOST', '2'))
+# URLs check_urls reads ahead of the running checks (bounds memory for huge inputs)
+CHECK_MAX_QUEUED = int(os.getenv('CHECK_MAX_QUEUED', '10000'))
+
+
+async def check_url(url, engine=None, conditional=None):
+    """Checks a single URL and returns a result dictionary.
+
+    With `conditional` (default CHECK_CONDITIONAL), the previous check of the URL is used to send
+    If-None-Match/If-Modified-Since, and its SEO result is reused (result["reused"]) when the
+    server answers 304 or the body hash is unchanged.
+
+    result["timings"] breaks the time down per stage in milliseconds (see results.STAGES); stages that
+    didn't happen (e.g. connect on a reused connection) are None.
+    """
+    engine = engine or get_engine()
+    if conditional is None:
+        conditional = CHECK_CONDITIONAL
+    start_time = time.perf_counter()
+    timings = {}
+
+    result = {
+        "url": url,
+        "status": "",
+        "domain_info": {},
+        "seo": {"title": None, "description": None, "keywords": None},
+        "duration": "0.00s",
+        "reused": False,
+        "timings": {},
+    }
+
+    # Validate URL (validators is slow to import, so it's loaded on the first check)
+    import validators
+    if not validators.url(url):
+        result['status'] = "Invalid URL"
+        return _finish(result, timings, start_time)
+
+    # Extract domain
+    try:
+        labels, suffix = split_host(urlsplit(url).hostname or '')
+        if not labels or not labels[-1] or not suffix:
+            raise ValueError("Invalid domain")
+        domain = labels[-1] + '.' + suffix
+    except Exception:
+        result['status'] = "Invalid Domain"
+        return _finish(result, timings, start_time)
+
+    # The page fetch and the WHOIS / domain info lookup run concurrently, so a check takes about
+    # as long as the slower of the two
+    lookup = asyncio.ensure_future(_lookup_domain_timed(domain, engine, timings))
+    try:
+        await _fetch_page(url, engine, conditional, result, timings)
+        result['domain_info'] = await lookup
+    finally:
+        lookup.cancel()
+
+    return _finish(result, timings, start_time)
+
+
+async def _lookup_domain_timed(domain, engine, timings):
+    # Cached per registrable domain; the providers are raced (see domain.py)
+    with metrics.timed(timings, 'whois'):
+        return await lookup_domain(domain, engine)
+
+
+async def _fetch_page(url, engine, conditional, result, timings):
+    """Fetches the page for check_url, filling in result["status"], ["seo"] and ["reused"]."""
+    # Resolve first (usually a cache hit after a batch's pre-resolution), so a dead hostname
+    # fails fast instead of costing a connect timeout
+    if engine.resolver is not None:
+        try:
+            with metrics.timed(timings, 'dns'):
+                await engine.resolver.resolve(urlsplit(url).hostname or '')
+        except DnsError:
+            result['status'] = "Not Working (DNS)"
+            return
+
+    # Check if website is reachable and, if HTML, extract SEO info (non-HTML bodies are never read)
+    previous = page_cache.get(url) if conditional else None
+    headers = {}
+    if previous:
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+    try:
+        async with engine.stream(url, timeout=CHECK_TIMEOUT, headers=headers,
+                                 extensions={"trace": _tracer(timings)}) as response:
+            validators_seen = {"etag": response.headers.get('ETag'),
+                               "last_modified": response.headers.get('Last-Modified')}
+            if response.status_code == 304 and previous:
+                # Not modified since the last check: reuse its result
+                result['status'] = f"Working ({previous['status_code']})"
+                result['seo'] = previous['seo']
+                result['reused'] = True
+            else:
+                result['status'] = f"Working ({response.status_code})"
+                content_type = response.headers.get('Content-Type', '')
+                if response.status_code < 400 and 'text/html' in content_type:
+                    body_start = time.perf_counter()
+                    chunks = response.aiter_bytes()
+                    if previous and previous.get('body_hash'):
+                        unchanged, chunks = await _compare_body(chunks, previous)
+                        if unchanged:
+                            result['seo'] = previous['seo']
+                            result['reused'] = True
+                            page_cache.set(url, dict(previous, **validators_seen))
+                    if not result['reused']:
+                        result['seo'], body = await read_seo(response, engine, chunks, timings=timings)
+                        if conditional and body:
+                            page_cache.set(url, dict(body, status_code=response.status_code,
+                                                     seo=result['seo'], **validators_seen))
+                    # Body time net of the parser's share (the two interleave while streaming)
+                    timings['download_ms'] = max(0.0, (time.perf_counter() - body_start) * 1000
+                                                 - (timings.get('parse_ms') or 0))
+                elif previous:
+                    page_cache.delete(url)
+    except HostUnavailable:
+        # Failed repeatedly just now (see health.py); not worth another timeout
+        result['status'] = "Not Working (Host Down)"
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        result['status'] = "Not Working"
+        metrics.ERRORS.inc(stage='fetch', type=type(e).__name__)
+
+
+# httpcore trace events (minus their "connection."/"http11."/"http2." prefix) that start and end a stage
+_TRACE_STAGES = {
+    'connect_tcp.started': ('connect', True), 'connect_tcp.complete': ('connect', False),
+    'start_tls.started': ('tls', True), 'start_tls.complete': ('tls', False),
+    'send_request_headers.started': ('ttfb', True), 'receive_response_headers.complete': ('ttfb', False),
+}
+
+
+def _tracer(timings):
+    """httpx trace hook adding connect/TLS/TTFB time to timings (summed over redirects)."""
+    started = {}
+
+    async def trace(event, info):
+        stage = _TRACE_STAGES.get(event.split('.', 1)[-1])
+        if stage is None:
+            return
+        name, is_start = stage
+        if is_start:
+            started[name] = time.perf_counter()
+        elif name in started:
+            key = f"{name}_ms"
+            timings[key] = (timings.get(key) or 0) + (time.perf_counter() - started.pop(name)) * 1000
+
+    return trace
+
+
+def _finish(result, timings, start_time):
+    elapsed = time.perf_counter() - start_time
+    timings['total_ms'] = elapsed * 1000
+    result['timings'] = {f"{stage}_ms": None if timings.get(f"{stage}_ms") is None
+                         else round(timings[f"{stage}_ms"], 2) for stage in STAGES}
+    result['duration'] = f"{elapsed:.2f}s"
+    metrics.observe_timings(timings)
+    # "Working (200)" -> working, "Invalid Domain" -> invalid_domain, ...
+    metrics.CHECKS.inc(outcome=result['status'].split(' (')[0].lower().replace(' ', '_'))
+    return result
+
+
+async def read_seo(response, engine, chunks=None, max_bytes=CHECK_MAX_BODY_BYTES, head_only=SEO_HEAD_ONLY,
+                   timings=None):
+    """Streams an HTML body through SeoParser, decoding as it goes.
+
+    Reading stops after `max_bytes`, when the parser has everything it needs (head_only), or
+    when the body turns out to be binary; the SEO dict reflects what was read up to then.
+    Returns (seo, body) where body describes the bytes the parser consumed
+    ({"body_hash", "hashed_bytes", "complete"}), or None if the read didn't finish cleanly.
+    Time spent parsing is added to timings["parse_ms"].
+
+    When the engine parses in worker processes, the body is read first and handed over as
+    bytes in one piece (with head_only, reading stops at "</head").
+    """
+    timings = {} if timings is None else timings
+    pooled = engine.parse_processes > 0
+    parser = None if pooled else SeoParser(head_only=head_only)
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    hasher = hashlib.blake2b(digest_size=16)
+    body = []
+    tail = b''
+    received = 0
+    complete = False
+    try:
+        async for chunk in (chunks or response.aiter_bytes()):
+            if received == 0 and b'\x00' in chunk[:1024]:
+                # Labelled text/html but it's binary
+                return empty_seo(), None
+            chunk = chunk[:max_bytes - received]
+            received += len(chunk)
+            hasher.update(chunk)
+            if pooled:
+                body.append(chunk)
+                # The tail carries a tag split across chunks
+                window = tail + chunk.lower()
+                tail = window[-6:]
+                if (head_only and b'</head' in window) or received >= max_bytes:
+                    break
+                continue
+            with metrics.timed(timings, 'parse'):
+                await engine.run_blocking(parser.feed, decoder.decode(chunk))
+            if parser.done or received >= max_bytes:
+                break
+        else:
+            complete = True
+            if not pooled:
+                parser.feed(decoder.decode(b'', final=True))
+    except httpx.HTTPError as e:
+        print(f"[check] body read failed for {response.url} after {received} bytes: {e}", file=sys.stderr)
+        metrics.ERRORS.inc(stage='download', type=type(e).__name__)
+        complete = None
+    except Exception as e:
+        metrics.ERRORS.inc(stage='parse', type=type(e).__name__)
+        return empty_seo(), None
+
+    try:
+        with metrics.timed(timings, 'parse'):
+            if pooled:
+                seo = await engine.parse(extract_seo_from_bytes, b''.join(body), response.encoding, head_only)
+            else:
+                await engine.run_blocking(parser.close)
+                seo = parser.result()
+    except Exception as e:
+        metrics.ERRORS.inc(stage='parse', type=type(e).__name__)
+        return empty_seo(), None
+    if complete is None:
+        return seo, None
+    return seo, {"body_hash": hasher.hexdigest(), "hashed_bytes": received, "complete": complete}
+
+
+async def _replay(buffered, chunks):
+    for chunk in buffered:
+        yield chunk
+    async for chunk in chunks:
+        yield chunk
+
+
+async def _compare_body(chunks, previous):
+    """Reads just enough of the body to tell whether it matches the previous check's hash.
+
+    Returns (unchanged, chunks) where chunks replays what was read, then the rest of the body.
+    """
+    chunks = chunks.__aiter__()
+    target = previous['hashed_bytes']
+    hasher = hashlib.blake2b(digest_size=16)
+    buffered = []
+    read = 0
+    unchanged = False
+    try:
+        while read < target:
+            chunk = await chunks.__anext__()
+            buffered.append(chunk)
+            hasher.update(chunk[:target - read])
+            read += len(chunk)
+        if hasher.hexdigest() == previous['body_hash']:
+            if not previous['complete']:
+                # Only the prefix was parsed last time, so only the prefix matters
+                unchanged = True
+            elif read == target:
+                try:
+                    buffered.append(await chunks.__anext__())
+                except StopAsyncIteration:
+                    unchanged = True
+    except StopAsyncIteration:
+        pass  # Shorter than last time
+    return unchanged, _replay(buffered, chunks)
+
+
+async def check_urls(urls, concurrency=CHECK_CONCURRENCY, per_host=CHECK_PER_HOST, engine=None, conditional=None,
+                     max_queued=CHECK_MAX_QUEUED, compact=False):
+    """Checks many URLs concurrently, yielding (index, result) as each check finishes.
+
+    At most `concurrency` checks run at once and at most `per_host` of them target the same host.
+    Hosts are served round-robin, so one large domain can't starve the rest of the list.
+
+    `urls` may be any iterable (a generator over a huge file, say); it is read ahead only
+    `max_queued` URLs at a time, so memory doesn't grow with the input.
+
+    With compact=True the results are CheckResult objects (results.py) instead of dicts: numeric
+    timings and dates, shared status strings, a fraction of the memory when results are kept.
+    """
+    engine = engine or get_engine()
+    concurrency = max(1, concurrency)
+    per_host = max(1, per_host)
+    max_queued = max(1, max_queued)
+
+    source = enumerate(urls)
+    exhausted = False
+    queued = 0
+    queues = {}
+    host_counts = {}
+    ready = deque()  # hosts with queued URLs and spare capacity
+    in_flight = {}
+    prefetches = set()
+
+    def fill():
+        # Reads ahead up to max_queued URLs into the per-host queues
+        nonlocal exhausted, queued
+        new_hosts = set()
+        for index, u in source:
+            host = urlsplit(u).netloc.lower()
+            queue = queues.get(host)
+            if queue is None:
+                queue = queues[host] = deque()
+                host_counts.setdefault(host, 0)
+                new_hosts.add(urlsplit(u).hostname)
+            if not queue and host_counts[host] < per_host:
+                ready.append(host)
+            queue.append((index, u))
+            queued += 1
+            if queued >= max_queued:
+                break
+        else:
+            exhausted = True
+        # Pre-resolution: the new hostnames are looked up concurrently up front, and each
+        # check then waits only for its own host's answer (shared, not repeated)
+        if engine.resolver is not None and new_hosts:
+            task = asyncio.ensure_future(engine.resolver.prefetch(new_hosts))
+            prefetches.add(task)
+            task.add_done_callback(prefetches.discard)
+
+    try:
+        fill()
+        while ready or in_flight:
+            while ready and len(in_flight) < concurrency:
+                host = ready.popleft()
+                index, u = queues[host].popleft()
+                queued -= 1
+                host_counts[host] += 1
+                in_flight[asyncio.ensure_future(check_url(u, engine, conditional))] = (index, u, host)
+                if queues[host] and host_counts[host] < per_host:
+                    ready.append(host)
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, u, host = in_flight.pop(task)
+                host_counts[host] -= 1
+                # Host just dropped below its cap: put it back in rotation
+                if queues[host] and host_counts[host] == per_host - 1:
+                    ready.append(host)
+                elif not queues[host] and not host_counts[host]:
+                    # Forget finished hosts, so a long stream of distinct hosts doesn't pile up
+                    del queues[host], host_counts[host]
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"[batch] check failed for {u}: {e}", file=sys.stderr)
+                    metrics.ERRORS.inc(stage='check', type=type(e).__name__)
+                    result = {"url": u, "status": "Check Failed", "domain_info": {}, "seo": {}, "duration": "0.00s",
+                              "reused": False, "timings": {}}
+                yield index, CheckResult.from_dict(result) if compact else result
+            # Read ahead in batches, so the pre-resolution covers many hosts at once
+            if not exhausted and queued <= max_queued // 2:
+                fill()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        for task in list(prefetches):
+            task.cancel()
+
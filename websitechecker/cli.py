@@ -0,0 +1,342 @@
+"""Command-line interface.
+
+    python -m websitechecker check urls.txt                      # JSONL on stdout
+    python -m websitechecker check urls.txt -o results.csv       # format from the extension
+    python -m websitechecker check huge.txt -o out.jsonl --concurrency 300
+    python -m websitechecker check huge.txt -o results.parquet   # directory of Parquet parts
+
+`check` reads one URL per line (blank lines and # comments are skipped; "-" reads stdin),
+checks them concurrently and writes each result as soon as it is ready. With an output file,
+progress is checkpointed next to it (<output>.checkpoint); running the same command again
+after an interruption resumes where it stopped, without re-checking finished URLs.
+
+Parquet and Arrow output (numeric columns, see results.COLUMNS) is a directory of part files,
+one per checkpoint, which pyarrow.dataset / pandas / DuckDB read as one table. Without pyarrow
+installed the parts are written as CSV instead.
+
+`monitor` keeps a set of URLs under watch (see monitor.py):
+
+    python -m websitechecker monitor add portfolio.txt
+    python -m websitechecker monitor run --interval 86400 --events changes.jsonl --webhook https://...
+    python -m websitechecker monitor status
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from .checker import CHECK_CONCURRENCY, CHECK_PER_HOST, check_urls
+from .engine import iterate
+from .results import ColumnarWriter, columnar_format, format_for_path
+
+# How often progress is checkpointed (and output flushed)
+CLI_CHECKPOINT_INTERVAL = float(os.getenv('CLI_CHECKPOINT_INTERVAL', '5'))
+
+CSV_FIELDS = ('index', 'url', 'status', 'duration', 'registrar', 'registered_on', 'expires_on', 'updated_on',
+              'seo_score', 'seo_grade', 'title', 'description', 'keywords', 'og_title', 'og_description',
+              'twitter_card', 'canonical', 'h1_tags', 'total_images', 'images_without_alt', 'reused', 'total_ms')
+
+
+def read_urls(path):
+    """Yields (n, url as given) for each URL in a file, n counting URLs from 0."""
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8', errors='replace')
+    try:
+        n = 0
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith('#'):
+                continue
+            yield n, url
+            n += 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _csv_row(n, url, result):
+    info = result.get('domain_info') or {}
+    seo = result.get('seo') or {}
+    row = {"index": n, "url": url, "status": result.get('status'), "duration": result.get('duration'),
+           "reused": result.get('reused'), "total_ms": (result.get('timings') or {}).get('total_ms')}
+    for key in ('registrar', 'registered_on', 'expires_on', 'updated_on'):
+        row[key] = info.get(key)
+    for key in ('seo_score', 'seo_grade', 'title', 'description', 'keywords', 'og_title', 'og_description',
+                'twitter_card', 'canonical', 'total_images', 'images_without_alt'):
+        row[key] = seo.get(key)
+    row['h1_tags'] = '; '.join(seo.get('h1_tags') or [])
+    return row
+
+
+class ResultWriter:
+    """Appends results to a JSONL or CSV stream."""
+
+    def __init__(self, stream, output_format, header=True):
+        self.stream = stream
+        self.format = output_format
+        self._csv = None
+        if output_format == 'csv':
+            self._csv = csv.DictWriter(stream, CSV_FIELDS, extrasaction='ignore')
+            if header:
+                self._csv.writeheader()
+
+    def write(self, n, url, result):
+        if self._csv is not None:
+            self._csv.writerow(_csv_row(n, url, result))
+        else:
+            self.stream.write(json.dumps(dict(result, index=n, url=url)) + '\n')
+
+
+class PartWriter:
+    """Writes results to numbered part files in a directory (Parquet, Arrow IPC or CSV).
+
+    Columnar files can't be appended to or cut back, so each checkpoint closes the current part
+    instead; a resumed run deletes the parts written after the last checkpoint.
+    """
+
+    def __init__(self, directory, output_format, parts=0):
+        self.directory = directory
+        self.format = output_format
+        self.parts = parts
+        self._part = None
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith('part-') and int(name[5:].split('.')[0]) >= parts:
+                os.remove(os.path.join(directory, name))
+
+    def write(self, n, url, result):
+        if self._part is None:
+            path = os.path.join(self.directory, f"part-{self.parts:05d}.{self.format}")
+            self._part = ColumnarWriter(path, self.format, extra=[('index', 'int64')])
+        self._part.write(result, index=n)
+
+    def rotate(self):
+        """Closes the current part; returns the number of finished parts."""
+        if self._part is not None:
+            self._part.close()
+            self._part = None
+            self.parts += 1
+        return self.parts
+
+
+class Checkpoint:
+    """Which input URLs are finished, saved atomically as JSON.
+
+    `position` is the number of leading URLs that are all finished; `done` holds the finished
+    ones past it (checks complete out of order). `output_bytes` is the output file's size at
+    the time of the save: anything written after it is cut off on resume and checked again,
+    so every URL ends up in the output exactly once. For part-file output `parts` plays that
+    role instead.
+    """
+
+    def __init__(self, path, input_path):
+        self.path = path
+        self.input_path = input_path
+        self.position = 0
+        self.done = set()
+        self.output_bytes = 0
+        self.parts = 0
+
+    def load(self):
+        """Reads a previous run's checkpoint; False when there isn't one (for this input)."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('input') != os.path.abspath(self.input_path):
+            return False
+        self.position = data['position']
+        self.done = set(data['done'])
+        self.output_bytes = data['output_bytes']
+        self.parts = data.get('parts', 0)
+        return True
+
+    def is_done(self, n):
+        return n < self.position or n in self.done
+
+    def mark(self, n):
+        self.done.add(n)
+        while self.position in self.done:
+            self.done.remove(self.position)
+            self.position += 1
+
+    def save(self, output_bytes, parts=0):
+        self.output_bytes = output_bytes
+        self.parts = parts
+        data = {"input": os.path.abspath(self.input_path), "position": self.position,
+                "done": sorted(self.done), "output_bytes": output_bytes, "parts": parts, "saved_at": time.time()}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def run_check(args):
+    output_format = args.format or (format_for_path(args.output, 'jsonl') if args.output else 'jsonl')
+    columnar = output_format in ('parquet', 'arrow')
+    if columnar and not args.output:
+        print(f"[cli] {output_format} output needs -o", file=sys.stderr)
+        return 2
+    checkpoint = None
+    resumed = False
+    out = None
+    if args.output:
+        checkpoint = Checkpoint(args.checkpoint or args.output.rstrip('/') + '.checkpoint', args.input)
+        resumed = not args.restart and checkpoint.load() and os.path.exists(args.output)
+        if not resumed:
+            checkpoint = Checkpoint(checkpoint.path, args.input)
+        elif not columnar:
+            out = open(args.output, 'r+', encoding='utf-8', newline='')
+            # Drop results written after the last checkpoint; those URLs are checked again
+            out.truncate(checkpoint.output_bytes)
+            out.seek(checkpoint.output_bytes)
+        if resumed:
+            print(f"[cli] resuming: {checkpoint.position + len(checkpoint.done)} URLs already done",
+                  file=sys.stderr)
+        if out is None and not columnar:
+            out = open(args.output, 'w', encoding='utf-8', newline='')
+    else:
+        out = sys.stdout
+    if columnar:
+        writer = PartWriter(args.output, columnar_format(output_format), checkpoint.parts)
+    else:
+        writer = ResultWriter(out, output_format, header=not resumed)
+
+    def save():
+        if columnar:
+            checkpoint.save(0, writer.rotate())
+        else:
+            out.flush()
+            checkpoint.save(out.tell())
+
+    # Check index -> (input number, url as given); only holds URLs read ahead but not yet finished
+    pending = {}
+    fed = itertools.count()
+
+    def to_check():
+        for n, url in read_urls(args.input):
+            if checkpoint is not None and checkpoint.is_done(n):
+                continue
+            pending[next(fed)] = (n, url)
+            yield url if url.startswith('http') else 'http://' + url
+
+    checked = 0
+    start = last_save = time.monotonic()
+    results = iterate(check_urls(to_check(), args.concurrency, args.per_host, conditional=args.conditional,
+                                 compact=columnar))
+    # Set from writing a result until it's marked done: an interruption in between may leave the
+    # row in the output without marking it, so the final save is skipped and the last one stands
+    writing = False
+    try:
+        for index, result in results:
+            n, url = pending.pop(index)
+            writing = True
+            writer.write(n, url, result)
+            checked += 1
+            if checkpoint is not None:
+                checkpoint.mark(n)
+            writing = False
+            if checkpoint is not None:
+                if time.monotonic() - last_save >= CLI_CHECKPOINT_INTERVAL:
+                    save()
+                    last_save = time.monotonic()
+                    rate = checked / (last_save - start)
+                    print(f"[cli] {checked} checked ({rate:.1f}/s), {checkpoint.position} in order",
+                          file=sys.stderr)
+    finally:
+        results.close()
+        if checkpoint is not None:
+            if not writing:
+                save()
+            if out is not None:
+                out.close()
+        else:
+            out.flush()
+    print(f"[cli] done: {checked} URLs checked in {time.monotonic() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+def _monitor_urls(path):
+    return [url if url.startswith('http') else 'http://' + url for _, url in read_urls(path)]
+
+
+def run_monitor(args):
+    import asyncio
+    from .engine import Engine
+    from .monitor import FileSink, Monitor, MonitorStore, WebhookSink
+
+    store = MonitorStore(args.db) if args.db else MonitorStore()
+    if args.action == 'add':
+        added = store.add(_monitor_urls(args.input), args.interval)
+        print(f"[monitor] {added} URLs added", file=sys.stderr)
+    elif args.action == 'remove':
+        removed = store.remove(_monitor_urls(args.input))
+        print(f"[monitor] {removed} URLs removed", file=sys.stderr)
+    elif args.action == 'status':
+        print(json.dumps(store.summary(), indent=2))
+    else:
+        async def monitor():
+            async with Engine() as engine:
+                sinks = [FileSink(args.events)] if args.events else []
+                sinks += [WebhookSink(url, engine) for url in args.webhook]
+                if not sinks:
+                    sinks.append(_StdoutSink())
+                runner = Monitor(store, sinks, args.interval, args.jitter, args.concurrency, engine=engine)
+                print(f"[monitor] watching {store.summary()['urls']} URLs, every {args.interval:g}s",
+                      file=sys.stderr)
+                await runner.run(args.duration)
+                print(f"[monitor] {runner.checked} checks, {runner.events} events", file=sys.stderr)
+
+        asyncio.run(monitor())
+    return 0
+
+
+class _StdoutSink:
+    async def emit(self, events):
+        for event in events:
+            print(json.dumps(event), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m websitechecker', description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help='check a list of URLs (one per line)')
+    check.add_argument('input', help='file with one URL per line, or - for stdin')
+    check.add_argument('-o', '--output', help='results file (default stdout, no checkpointing)')
+    check.add_argument('--format', choices=('jsonl', 'csv', 'parquet', 'arrow'),
+                       help='default: from the output extension, else jsonl')
+    check.add_argument('--concurrency', type=int, default=CHECK_CONCURRENCY)
+    check.add_argument('--per-host', type=int, default=CHECK_PER_HOST)
+    check.add_argument('--conditional', action='store_true', default=None,
+                       help='reuse unchanged pages from previous checks (see CHECK_CONDITIONAL)')
+    check.add_argument('--checkpoint', help='checkpoint file (default <output>.checkpoint)')
+    check.add_argument('--restart', action='store_true', help='ignore an existing checkpoint and start over')
+    check.set_defaults(run=run_check)
+
+    from .monitor import MONITOR_CONCURRENCY, MONITOR_INTERVAL, MONITOR_JITTER
+    monitor = commands.add_parser('monitor', help='re-check a stored set of URLs on a schedule, reporting changes')
+    monitor.add_argument('action', choices=('add', 'remove', 'run', 'status'))
+    monitor.add_argument('input', nargs='?', help='for add/remove: file with one URL per line, or - for stdin')
+    monitor.add_argument('--db', help='monitor database (default MONITOR_DB_PATH)')
+    monitor.add_argument('--interval', type=float, default=MONITOR_INTERVAL, help='seconds between checks of a URL')
+    monitor.add_argument('--jitter', type=float, default=MONITOR_JITTER, help='fraction of the interval')
+    monitor.add_argument('--concurrency', type=int, default=MONITOR_CONCURRENCY)
+    monitor.add_argument('--events', help='append change events to this JSONL file')
+    monitor.add_argument('--webhook', action='append', default=[], help='POST change events to this URL')
+    monitor.add_argument('--duration', type=float, help='stop after this many seconds (default: run until ^C)')
+    monitor.set_defaults(run=run_monitor)
+
+    args = parser.parse_args(argv)
+    if args.command == 'monitor' and args.action in ('add', 'remove') and not args.input:
+        parser.error(f"monitor {args.action} needs an input file")
+    try:
+        return args.run(args)
+    except KeyboardInterrupt:
+        print("[cli] interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
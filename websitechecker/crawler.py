@@ -0,0 +1,307 @@
+import asyncio
+import itertools
+import os
+import sys
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from .engine import get_engine
+from .seo import SeoParser, empty_seo
+
+CRAWL_USER_AGENT = 'SitemapGeneratorBot/1.0'
+CRAWL_TIMEOUT = float(os.getenv('CRAWL_TIMEOUT', '5'))
+# Parallel fetches per crawl, and the politeness cap on requests/sec to the crawled host
+CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', '8'))
+CRAWL_PER_HOST_RPS = float(os.getenv('CRAWL_PER_HOST_RPS', '10'))
+# Upper bound on HTML downloaded per crawled page (links past it aren't seen)
+CRAWL_MAX_BODY_BYTES = int(os.getenv('CRAWL_MAX_BODY_BYTES', str(2 * 1024 * 1024)))
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Query params that only track the visitor and never change the page
+TRACKING_PARAMS = {'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid'}
+
+
+def normalize_url(url):
+    """Canonical form used to dedupe crawled URLs.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking params (utm_* etc.)
+    and trailing slashes (except on the root), and sorts the remaining query params.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if ':' in host:
+        host = f"[{host}]"  # IPv6 literal
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+
+def _absolute(base_url, hrefs):
+    """hrefs resolved against base_url; ones that can't be parsed (malformed IPv6 hosts) are skipped."""
+    urls = []
+    for href in hrefs:
+        try:
+            urls.append(urljoin(base_url, href))
+        except ValueError:
+            continue
+    return urls
+
+
+def _extract_links(html, base_url):
+    """Absolute links from every <a href> on a page."""
+    parser = SeoParser(collect_links=True)
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass  # Keep the links found before the parser gave up
+    return _absolute(base_url, parser.links)
+
+
+def _extract_links_and_seo(html, base_url, resources=False):
+    """(links, seo, resources) from a single SeoParser pass over the page."""
+    parser = SeoParser(collect_links=True, collect_resources=resources)
+    try:
+        parser.feed(html)
+        parser.close()
+        seo = parser.result()
+    except Exception:
+        seo = empty_seo()
+    page_resources = []
+    for tag, url in parser.resources:
+        page_resources.extend((tag, absolute) for absolute in _absolute(base_url, [url]))
+    return _absolute(base_url, parser.links), seo, page_resources
+
+
+def _parse_page(content, encoding, base_url, seo, resources=False):
+    """(links, seo or None, resources) from a raw page body; runs in Engine.parse, possibly in
+    another process."""
+    html = content.decode(encoding or 'utf-8', errors='replace')
+    if seo or resources:
+        links, page_seo, page_resources = _extract_links_and_seo(html, base_url, resources)
+        return links, page_seo if seo else None, page_resources
+    return _extract_links(html, base_url), None, []
+
+
+async def _fetch_robots(start_url, engine):
+    """Parsed robots.txt for the site, or None when there isn't a usable one (crawl everything)."""
+    parts = urlsplit(start_url)
+    try:
+        response = await engine.get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=CRAWL_TIMEOUT,
+                                    headers={'User-Agent': CRAWL_USER_AGENT})
+        if response.status_code != 200:
+            return None
+        robots = RobotFileParser()
+        robots.parse(response.text.splitlines())
+        return robots
+    except Exception as e:
+        print(f"[crawl] robots.txt fetch failed for {parts.netloc}: {e}", file=sys.stderr)
+        return None
+
+
+def _targets(links, resources):
+    """[[tag, url]] for every http(s) link and resource on a page, de-duplicated, fragments dropped."""
+    targets = {}
+    for tag, url in itertools.chain((('a', link) for link in links), resources):
+        try:
+            url = urldefrag(url.strip())[0]
+            if urlsplit(url).scheme in DEFAULT_PORTS:
+                targets.setdefault(url, tag)
+        except ValueError:
+            continue  # Unparsable (bad port, malformed IPv6 host)
+    return [[tag, url] for url, tag in targets.items()]
+
+
+def _internal_links(links, hosts):
+    """Normalized, de-duplicated http(s) links to the site's hosts (netlocs), in page order."""
+    internal = {}
+    for link in links:
+        try:
+            if urlsplit(link).scheme not in DEFAULT_PORTS:
+                continue
+            normalized = normalize_url(link)
+        except ValueError:
+            continue  # Unparsable (bad port, malformed IPv6 host)
+        if urlsplit(normalized).netloc in hosts:
+            internal[normalized] = None
+    return list(internal)
+
+
+async def _read_body(response, max_bytes):
+    """Up to max_bytes of a streamed response's body."""
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk[:max_bytes - len(body)]
+        if len(body) >= max_bytes:
+            break
+    return bytes(body)
+
+
+class _Pacer:
+    """Spaces requests at least `interval` seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if self.interval <= 0:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def iter_crawl(start_url, max_pages=50, max_depth=None, time_budget=None,
+                     concurrency=CRAWL_CONCURRENCY, engine=None, seo=False, targets=False):
+    """Crawls a site breadth-first, yielding {"url", "depth", "status"} for each page as it's fetched.
+
+    Only same-host links allowed by robots.txt are followed; when the start page redirects to
+    another host (apex -> www, http -> https on another name), that host counts as the site's
+    too. Only HTML bodies are downloaded, up to CRAWL_MAX_BODY_BYTES each. Requests are paced to
+    CRAWL_PER_HOST_RPS, or to the robots.txt Crawl-delay when that is slower. The crawl stops
+    after `max_pages` pages, past `max_depth` link hops, or after `time_budget` seconds.
+
+    With seo=True each page also carries "seo" (extract_seo_from_html of the fetched HTML, or
+    None for non-HTML/failed pages) and "links" (its normalized same-host links), from the
+    same fetch and parse used for crawling. With targets=True each page carries "targets":
+    [[tag, url]] for every <a href>, <img src>, <script src> and <link href> on it, on any host.
+    """
+    engine = engine or get_engine()
+    start_url = normalize_url(start_url)
+    # The site's hosts: the start URL's, plus the one its start page redirects to
+    hosts = {urlsplit(start_url).netloc}
+    headers = {'User-Agent': CRAWL_USER_AGENT}
+
+    robots = await _fetch_robots(start_url, engine)
+    crawl_delay = (robots.crawl_delay(CRAWL_USER_AGENT) if robots else None) or 0
+    pacer = _Pacer(max(float(crawl_delay), 1 / CRAWL_PER_HOST_RPS if CRAWL_PER_HOST_RPS > 0 else 0))
+
+    def allowed(url):
+        if robots is None:
+            return True
+        try:
+            return robots.can_fetch(CRAWL_USER_AGENT, url)
+        except Exception:
+            return True
+
+    # Frontier ordered by depth (BFS); the counter keeps discovery order within a depth
+    frontier = asyncio.PriorityQueue()
+    order = itertools.count()
+    seen = {start_url}
+    pages = asyncio.Queue(maxsize=max(1, concurrency) * 2)
+    finished = object()
+
+    if allowed(start_url):
+        frontier.put_nowait((0, next(order), start_url))
+
+    async def worker():
+        while True:
+            depth, _, url = await frontier.get()
+            try:
+                await pacer.wait()
+                status = None
+                links = []
+                page_seo = None
+                resources = []
+                try:
+                    content = None
+                    async with engine.stream(url, timeout=CRAWL_TIMEOUT, headers=headers) as response:
+                        status = response.status_code
+                        final_url = str(response.url)
+                        # Only successful HTML pages are read (and parsed); other bodies are never downloaded
+                        if status == 200 and 'text/html' in response.headers.get('Content-Type', ''):
+                            content = await _read_body(response, CRAWL_MAX_BODY_BYTES)
+                    if depth == 0:
+                        final = normalize_url(final_url)
+                        hosts.add(urlsplit(final).netloc)
+                        seen.add(final)
+                    if content is not None:
+                        links, page_seo, resources = await engine.parse(_parse_page, content, response.encoding,
+                                                                        final_url, seo, targets)
+                except Exception:
+                    pass  # Pages that fail to load are reported with status None
+
+                if max_depth is None or depth < max_depth:
+                    for link in links:
+                        if len(seen) >= max_pages:
+                            break
+                        try:
+                            if urlsplit(link).scheme not in DEFAULT_PORTS:
+                                continue
+                            normalized = normalize_url(link)
+                        except ValueError:
+                            continue  # Unparsable (bad port, malformed IPv6 host)
+                        if normalized in seen or urlsplit(normalized).netloc not in hosts:
+                            continue
+                        # Check robots rules against the link as written too: normalizing
+                        # strips the trailing slash a "Disallow: /dir/" rule matches on
+                        if not allowed(link) or not allowed(normalized):
+                            continue
+                        seen.add(normalized)
+                        frontier.put_nowait((depth + 1, next(order), normalized))
+
+                page = {"url": url, "depth": depth, "status": status}
+                if seo:
+                    page['seo'] = page_seo
+                    page['links'] = _internal_links(links, hosts)
+                if targets:
+                    page['targets'] = _targets(links, resources)
+                await pages.put(page)
+            except Exception as e:
+                # One bad page must not take the worker (and with it the frontier's join) down
+                print(f"[crawl] failed to process {url}: {e}", file=sys.stderr)
+            finally:
+                frontier.task_done()
+
+    async def supervisor():
+        await frontier.join()
+        await pages.put(finished)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + time_budget if time_budget else None
+    tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    tasks.append(asyncio.ensure_future(supervisor()))
+    try:
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    print(f"[crawl] time budget of {time_budget}s reached for {start_url}", file=sys.stderr)
+                    break
+            try:
+                page = await asyncio.wait_for(pages.get(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            if page is finished:
+                break
+            yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def crawl_site(start_url, max_pages=50, max_depth=None, time_budget=None, engine=None):
+    """Crawls a site to find internal links. Returns a set of URLs."""
+    try:
+        visited_links = set()
+        async for page in iter_crawl(start_url, max_pages, max_depth, time_budget, engine=engine):
+            visited_links.add(page['url'])
+        return visited_links or {start_url}
+    except Exception as e:
+        print(f"Crawl failed for {start_url}: {e}", file=sys.stderr)
+        return {start_url}  # Return at least the base URL
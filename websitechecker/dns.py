@@ -0,0 +1,191 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import httpcore
+import httpx
+
+from . import metrics
+
+try:
+    import aiodns  # optional: real record TTLs and no thread per lookup
+except ImportError:
+    aiodns = None
+
+# Used when the record's TTL isn't known (getaddrinfo, /etc/hosts); real TTLs are clamped to the range
+DNS_CACHE_TTL = float(os.getenv('DNS_CACHE_TTL', '300'))
+DNS_CACHE_MIN_TTL = float(os.getenv('DNS_CACHE_MIN_TTL', '30'))
+DNS_CACHE_MAX_TTL = float(os.getenv('DNS_CACHE_MAX_TTL', '3600'))
+# Unresolvable names are remembered for this long
+DNS_NEGATIVE_TTL = float(os.getenv('DNS_NEGATIVE_TTL', '60'))
+DNS_CACHE_MAX_ENTRIES = int(os.getenv('DNS_CACHE_MAX_ENTRIES', '50000'))
+DNS_TIMEOUT = float(os.getenv('DNS_TIMEOUT', '5'))
+# Concurrent lookups during a batch's pre-resolution stage
+DNS_CONCURRENCY = int(os.getenv('DNS_CONCURRENCY', '200'))
+
+
+class DnsError(OSError):
+    """A hostname couldn't be resolved (or the lookup timed out)."""
+
+
+class UnresolvedHost(httpx.ConnectError):
+    """A request's hostname didn't resolve. Permanent for the request (the failure is cached for
+    DNS_NEGATIVE_TTL), so it is neither retried nor held against the host's health."""
+
+
+class DnsCache:
+    """Hostname -> addresses, kept for the record's TTL; failed lookups are cached as None."""
+
+    def __init__(self, max_entries=DNS_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()  # host -> (expires_at, addresses or None)
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """(True, addresses-or-None) for a live entry, (False, None) otherwise."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                del self._entries[host]
+                return False, None
+            self._entries.move_to_end(host)
+            return True, entry[1]
+
+    def set(self, host, addresses, ttl):
+        with self._lock:
+            self._entries[host] = (time.time() + ttl, addresses)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dns_cache = DnsCache()
+
+
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+class Resolver:
+    """Cached, single-flight hostname resolution for an engine (uses aiodns when installed)."""
+
+    def __init__(self, engine, cache=None):
+        self.engine = engine
+        self.cache = cache or dns_cache
+        self._aiodns = None
+
+    async def resolve(self, host):
+        """Addresses for host (IPv4 first); raises DnsError when it doesn't resolve."""
+        host = host.lower().rstrip('.')
+        if _is_ip(host):
+            return [host.strip('[]')]
+        found, addresses = self.cache.get(host)
+        if found:
+            metrics.DNS_LOOKUPS.inc(result='hit' if addresses else 'negative_hit')
+        else:
+            metrics.DNS_LOOKUPS.inc(result='miss')
+            addresses = await self.engine.single_flight(('dns', host), lambda: self._lookup(host))
+        if not addresses:
+            raise DnsError(f"DNS lookup failed for {host}")
+        return addresses
+
+    async def prefetch(self, hosts, concurrency=DNS_CONCURRENCY):
+        """Resolves many hosts concurrently to warm the cache; failures are cached, not raised."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(host):
+            async with semaphore:
+                try:
+                    await self.resolve(host)
+                except DnsError:
+                    pass
+
+        await asyncio.gather(*(one(h) for h in hosts if h))
+
+    async def _lookup(self, host):
+        try:
+            addresses, ttl = await asyncio.wait_for(self._query(host), DNS_TIMEOUT)
+        except Exception as e:
+            # NXDOMAIN, no answer, timeouts (socket.gaierror, aiodns.error.DNSError, TimeoutError, ...)
+            metrics.ERRORS.inc(stage='dns', type=type(e).__name__)
+            self.cache.set(host, None, DNS_NEGATIVE_TTL)
+            return None
+        if not addresses:
+            self.cache.set(host, None, DNS_NEGATIVE_TTL)
+            return None
+        ttl = DNS_CACHE_TTL if not ttl else min(max(ttl, DNS_CACHE_MIN_TTL), DNS_CACHE_MAX_TTL)
+        self.cache.set(host, addresses, ttl)
+        return addresses
+
+    async def _query(self, host):
+        """(addresses, ttl or None)."""
+        if aiodns is not None:
+            if self._aiodns is None:
+                self._aiodns = aiodns.DNSResolver()
+            result = await self._aiodns.getaddrinfo(host, family=socket.AF_UNSPEC, type=socket.SOCK_STREAM)
+            nodes = sorted(result.nodes, key=lambda n: n.family != socket.AF_INET)
+            addresses = []
+            for node in nodes:
+                address = node.addr[0]
+                address = address.decode() if isinstance(address, bytes) else address
+                if address not in addresses:
+                    addresses.append(address)
+            ttls = [node.ttl for node in nodes if node.ttl]
+            return addresses, min(ttls) if ttls else None
+
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        addresses = []
+        for info in infos:
+            if info[4][0] not in addresses:
+                addresses.append(info[4][0])
+        return addresses, None
+
+
+class ResolvingBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that connects via the Resolver's cached addresses.
+
+    TLS still uses the URL's hostname for SNI and certificate checks (httpcore passes it to
+    start_tls separately).
+    """
+
+    def __init__(self, resolver, backend):
+        self._resolver = resolver
+        self._backend = backend
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = await self._resolver.resolve(host)
+        except DnsError as e:
+            # An httpx error (not httpcore's), so httpx passes it through as is rather than as ConnectError
+            raise UnresolvedHost(str(e)) from e
+        error = None
+        # Fall back to the next address when one is unreachable (e.g. a dead IPv6 route)
+        for address in addresses[:2]:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                                       socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
@@ -0,0 +1,272 @@
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse, urlsplit
+
+from . import metrics
+from .domain_cache import domain_cache
+from .engine import get_engine
+from .psl import registrable_domain as _registrable_domain
+from .rdap import get_rdap_client
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# python-whois talks to registries directly over port 43; set to 0 to go straight to RDAP
+PYTHON_WHOIS_ENABLED = os.getenv('PYTHON_WHOIS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+# Threads for python-whois, kept apart from the engine's blocking threads: a lookup that lost
+# the race can't be stopped and holds its thread until the registry's socket times out
+WHOIS_THREADS = int(os.getenv('WHOIS_THREADS', '4'))
+# Provider endpoint (overridable, e.g. to point at the benchmark's stand-in servers); see rdap.py for RDAP
+WHOIS_API_URL = os.getenv('WHOIS_API_URL', 'https://www.whoisxmlapi.com/whoisserver/WhoisService')
+# Overall time allowed for the provider race, and how long the free providers get before the paid one joins
+DOMAIN_LOOKUP_DEADLINE = float(os.getenv('DOMAIN_LOOKUP_DEADLINE', '15'))
+WHOIS_API_HEDGE_DELAY = float(os.getenv('WHOIS_API_HEDGE_DELAY', '1'))
+
+PROVIDER_NAMES = {'whois': 'python-whois', 'rdap': 'RDAP', 'whoisxmlapi': 'WHOIS API'}
+
+
+def _parse_iso(dt):
+    try:
+        if not dt:
+            return None
+        # rdap times often end with 'Z'
+        return datetime.fromisoformat(dt.replace('Z', '+00:00'))
+    except Exception:
+        return None
+
+
+def _first(d):
+    if isinstance(d, list):
+        return d[0] if d else None
+    return d
+
+
+def _format_date(d):
+    if not d:
+        return "Unknown"
+    return d.strftime(DATE_FORMAT) if hasattr(d, 'strftime') else str(d)
+
+
+def _unknown_info(domain):
+    return {"domain": domain, "registrar": "Unknown", "registered_on": "Unknown",
+            "expires_on": "Unknown", "updated_on": "Unknown"}
+
+
+_whois_executors = {}
+_whois_executors_lock = threading.Lock()
+
+
+def _whois_executor():
+    """This process's python-whois thread pool, started on first use."""
+    with _whois_executors_lock:
+        executor = _whois_executors.get(os.getpid())
+        if executor is None:
+            executor = _whois_executors[os.getpid()] = ThreadPoolExecutor(max_workers=max(1, WHOIS_THREADS),
+                                                                          thread_name_prefix='websitechecker-whois')
+        return executor
+
+
+async def _whois_lookup(domain, engine):
+    """python-whois lookup (blocking, so it runs on its own threads, see WHOIS_THREADS)."""
+    try:
+        import whois  # slow to import, so only on the first lookup
+    except ImportError:
+        raise RuntimeError("python-whois not installed")
+    w = await asyncio.get_running_loop().run_in_executor(_whois_executor(), whois.whois, domain)
+    return {
+        "domain": domain,
+        "registrar": w.registrar or "Unknown",
+        "registered_on": _format_date(_first(w.creation_date)),
+        "expires_on": _format_date(_first(w.expiration_date)),
+        "updated_on": _format_date(_first(w.updated_date)),
+    }
+
+
+async def _rdap_lookup(domain, engine):
+    """RDAP over HTTPS, straight from the registry. Returns None when the lookup isn't successful."""
+    rdap_resp = await get_rdap_client(engine).query(domain)
+    if rdap_resp.status_code >= 400:
+        print(f"[domain] RDAP returned status {rdap_resp.status_code} for {domain}", file=sys.stderr)
+        return None
+    rdap = rdap_resp.json()
+
+    creation = expiration = updated = None
+    # 'events' is common in RDAP responses
+    for ev in rdap.get('events', []):
+        action = (ev.get('eventAction') or '').lower()
+        date = ev.get('eventDate')
+        if 'registration' in action:
+            creation = _parse_iso(date) or creation
+        elif 'expiration' in action:
+            expiration = _parse_iso(date) or expiration
+        elif 'last' in action or 'update' in action:
+            updated = _parse_iso(date) or updated
+
+    # try to extract registrar from entities/vcard
+    registrar = "Unknown"
+    for ent in rdap.get('entities') or []:
+        vcard = ent.get('vcardArray')
+        if vcard and len(vcard) > 1:
+            for item in vcard[1]:
+                if len(item) >= 4 and item[0].lower() in ('fn', 'org', 'organization') and item[3]:
+                    registrar = item[3]
+                    break
+        if registrar != "Unknown":
+            break
+
+    return {
+        "domain": domain,
+        "registrar": registrar,
+        "registered_on": _format_date(creation),
+        "expires_on": _format_date(expiration),
+        "updated_on": _format_date(updated),
+    }
+
+
+async def _whois_api_lookup(domain, engine, api_key):
+    """Commercial WHOIS API (WHOISXMLAPI). Returns None when the lookup isn't successful."""
+    api_url = f"{WHOIS_API_URL}?apiKey={api_key}&domainName={domain}&outputFormat=JSON"
+    r = await engine.get(api_url)
+    if r.status_code >= 400:
+        print(f"[domain] WHOIS API returned {r.status_code} for {domain}", file=sys.stderr)
+        return None
+    whois_record = r.json().get('WhoisRecord', {})
+    result = _unknown_info(domain)
+    if whois_record.get('registrarName'):
+        result['registrar'] = whois_record['registrarName']
+    for key, field in (('registered_on', 'createdDate'), ('expires_on', 'expiresDate'),
+                       ('updated_on', 'updatedDate')):
+        value = whois_record.get(field)
+        if value:
+            parsed = _parse_iso(value)
+            result[key] = parsed.strftime(DATE_FORMAT) if parsed else value
+    return result
+
+
+def _lookup_failed(provider, error):
+    metrics.DOMAIN_LOOKUPS.inc(provider=provider, result='error')
+    metrics.ERRORS.inc(stage=provider, type=type(error).__name__)
+
+
+def _is_meaningful(info):
+    return info['registrar'] != "Unknown" or info['registered_on'] != "Unknown"
+
+
+async def _lookup_uncached(domain, engine):
+    """Races python-whois, RDAP and WHOISXMLAPI (if WHOIS_API_KEY is set); None if nothing is found.
+
+    The first meaningful answer wins and the other lookups are cancelled. WHOISXMLAPI is paid
+    for, so it only joins the race after WHOIS_API_HEDGE_DELAY seconds, or as soon as the free
+    providers have all come back empty. After DOMAIN_LOOKUP_DEADLINE seconds the best partial
+    answer so far is returned.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + DOMAIN_LOOKUP_DEADLINE
+    hedge_at = loop.time() + WHOIS_API_HEDGE_DELAY
+    api_key = os.getenv('WHOIS_API_KEY')
+
+    tasks = {}
+    if PYTHON_WHOIS_ENABLED:
+        tasks[asyncio.ensure_future(_whois_lookup(domain, engine))] = 'whois'
+    # RDAP over HTTPS — Render allows HTTPS egress
+    tasks[asyncio.ensure_future(_rdap_lookup(domain, engine))] = 'rdap'
+    partials = {}
+
+    try:
+        while tasks or api_key:
+            now = loop.time()
+            if now >= deadline:
+                print(f"[domain] lookup deadline ({DOMAIN_LOOKUP_DEADLINE}s) passed for {domain}", file=sys.stderr)
+                break
+            if api_key and (now >= hedge_at or not tasks):
+                tasks[asyncio.ensure_future(_whois_api_lookup(domain, engine, api_key))] = 'whoisxmlapi'
+                api_key = None
+            timeout = min(deadline, hedge_at) - now if api_key else deadline - now
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                provider = tasks.pop(task)
+                try:
+                    info = task.result()
+                except Exception as e:
+                    # Log the failure (visible in Render logs)
+                    print(f"[domain] {PROVIDER_NAMES[provider]} failed for {domain}: {e}", file=sys.stderr)
+                    _lookup_failed(provider, e)
+                    continue
+                # The commercial API's answer is taken as is
+                if info and (provider == 'whoisxmlapi' or _is_meaningful(info)):
+                    metrics.DOMAIN_LOOKUPS.inc(provider=provider, result='hit')
+                    return info
+                metrics.DOMAIN_LOOKUPS.inc(provider=provider, result='miss')
+                if info:
+                    partials[provider] = info
+    finally:
+        for task, provider in tasks.items():
+            task.cancel()
+            metrics.DOMAIN_LOOKUPS.inc(provider=provider, result='cancelled')
+
+    # Keep whatever a provider did return (e.g. only an expiry date) rather than nothing
+    for provider in ('whois', 'rdap'):
+        partial = partials.get(provider)
+        if partial and any(v != "Unknown" for k, v in partial.items() if k != 'domain'):
+            return partial
+    return None
+
+
+def registrable_domain(domain):
+    """example.co.uk for www.shop.example.co.uk; the input itself when it has no public suffix."""
+    try:
+        host = urlsplit(domain if '://' in domain else '//' + domain).hostname
+    except ValueError:
+        host = None
+    return _registrable_domain(host) or domain
+
+
+async def resolve_domain_info(domain, engine=None):
+    """Cached domain info for a registrable domain, or None when no provider has data.
+
+    Results (including failures, for a shorter time) are kept in domain_cache, and concurrent
+    lookups of the same domain share a single query.
+    """
+    engine = engine or get_engine()
+    domain = domain.lower()
+    cached = domain_cache.peek(domain)
+    if cached is domain_cache.missing and domain_cache.path:
+        # Not in memory: look in the SQLite file, off the event loop
+        cached = await engine.run_blocking(domain_cache.get, domain)
+    if cached is not domain_cache.missing:
+        metrics.DOMAIN_LOOKUPS.inc(provider='cache', result='hit')
+        return cached
+    metrics.DOMAIN_LOOKUPS.inc(provider='cache', result='miss')
+
+    async def lookup():
+        info = await _lookup_uncached(domain, engine)
+        if domain_cache.path:
+            await engine.run_blocking(domain_cache.set, domain, info)
+        else:
+            domain_cache.set(domain, info)
+        return info
+
+    return await engine.single_flight(('domain', domain), lookup)
+
+
+async def lookup_domain(domain, engine=None):
+    """WHOIS / domain info for check_url; {} when nothing is found."""
+    info = await resolve_domain_info(domain, engine)
+    return dict(info) if info else {}
+
+
+async def get_domain_info(raw, engine=None):
+    """Domain registration info for a bare domain or URL; fields are "Unknown" when nothing is found."""
+    domain = raw.strip()
+    # normalize: remove scheme/path
+    if domain.startswith('http://') or domain.startswith('https://'):
+        domain = urlparse(domain).netloc
+    domain = domain.rstrip('/')
+
+    info = await resolve_domain_info(registrable_domain(domain), engine)
+    if not info:
+        # Nothing found; return Unknowns
+        return _unknown_info(domain)
+    return dict(info, domain=domain)
@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from ._sqlite import SqliteConnection
+
+# Registration data rarely changes; failed lookups are retried sooner
+DOMAIN_CACHE_TTL = float(os.getenv('DOMAIN_CACHE_TTL', str(24 * 3600)))
+DOMAIN_CACHE_NEGATIVE_TTL = float(os.getenv('DOMAIN_CACHE_NEGATIVE_TTL', '600'))
+DOMAIN_CACHE_MAX_ENTRIES = int(os.getenv('DOMAIN_CACHE_MAX_ENTRIES', '10000'))
+# Optional SQLite file so the cache survives restarts and is shared by all workers on the host
+DOMAIN_CACHE_PATH = os.getenv('DOMAIN_CACHE_PATH')
+# How often a write also deletes the expired rows from that file (the first write after opening always does)
+DOMAIN_CACHE_PURGE_INTERVAL = float(os.getenv('DOMAIN_CACHE_PURGE_INTERVAL', '3600'))
+
+_MISSING = object()
+
+_SCHEMA = ('CREATE TABLE IF NOT EXISTS domain_info (domain TEXT PRIMARY KEY, value TEXT, expires_at REAL)',
+           'CREATE INDEX IF NOT EXISTS domain_info_expires_at ON domain_info (expires_at)')
+
+
+class DomainCache:
+    """TTL + LRU cache of domain info keyed by registrable domain, optionally backed by SQLite.
+
+    A cached value of None records a failed lookup (negative entry). get() returns _MISSING
+    (see `missing`) when there is no live entry. With a `path`, get() and set() do SQLite I/O,
+    so async callers check peek() first and run them with engine.run_blocking().
+    """
+
+    missing = _MISSING
+
+    def __init__(self, ttl=DOMAIN_CACHE_TTL, negative_ttl=DOMAIN_CACHE_NEGATIVE_TTL,
+                 max_entries=DOMAIN_CACHE_MAX_ENTRIES, path=DOMAIN_CACHE_PATH,
+                 purge_interval=DOMAIN_CACHE_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, max_entries)
+        self.path = path
+        self.purge_interval = purge_interval
+        self._purged_at = None
+        self._entries = OrderedDict()  # domain -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._connection = SqliteConnection(path, _SCHEMA, timeout=5)
+
+    def _remember(self, domain, expires_at, value):
+        self._entries[domain] = (expires_at, value)
+        self._entries.move_to_end(domain)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _memory_get(self, domain, now):
+        entry = self._entries.get(domain)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(domain)
+                return entry[1]
+            del self._entries[domain]
+        return _MISSING
+
+    def peek(self, domain):
+        """The live in-memory entry, or _MISSING; never touches SQLite."""
+        with self._lock:
+            return self._memory_get(domain, time.time())
+
+    def get(self, domain):
+        now = time.time()
+        with self._lock:
+            value = self._memory_get(domain, now)
+            if value is not _MISSING or not self.path:
+                return value
+            try:
+                row = self._connection().execute(
+                    'SELECT value, expires_at FROM domain_info WHERE domain = ? AND expires_at > ?',
+                    (domain, now)).fetchone()
+            except sqlite3.Error as e:
+                print(f"[domain-cache] read failed for {domain}: {e}", file=sys.stderr)
+                return _MISSING
+            if row is None:
+                return _MISSING
+            value = json.loads(row[0])
+            self._remember(domain, row[1], value)
+            return value
+
+    def set(self, domain, value):
+        now = time.time()
+        expires_at = now + (self.ttl if value is not None else self.negative_ttl)
+        with self._lock:
+            self._remember(domain, expires_at, value)
+            if not self.path:
+                return
+            try:
+                db = self._connection()
+                db.execute('INSERT OR REPLACE INTO domain_info (domain, value, expires_at) VALUES (?, ?, ?)',
+                           (domain, json.dumps(value), expires_at))
+                if self._purged_at is None or now - self._purged_at >= self.purge_interval:
+                    db.execute('DELETE FROM domain_info WHERE expires_at <= ?', (now,))
+                    self._purged_at = now
+            except sqlite3.Error as e:
+                print(f"[domain-cache] write failed for {domain}: {e}", file=sys.stderr)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._connection().execute('DELETE FROM domain_info')
+
+
+domain_cache = DomainCache()
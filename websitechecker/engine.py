@@ -0,0 +1,317 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from urllib.parse import urlsplit
+from urllib.request import getproxies
+
+import httpcore
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from . import metrics
+from .dns import Resolver, ResolvingBackend, UnresolvedHost
+from .health import HOST_FAILURES, RETRY_ATTEMPTS, TRANSIENT_ERRORS, host_health, jittered_backoff
+
+# Connection pool limits (overridable via env)
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '1000'))
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', '200'))
+HTTP_MAX_PER_HOST = int(os.getenv('HTTP_MAX_PER_HOST', '6'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))
+# Threads used for blocking work (python-whois, HTML parsing)
+BLOCKING_THREADS = int(os.getenv('BLOCKING_THREADS', '32'))
+# Worker processes for CPU-bound HTML parsing, so it isn't serialized by the GIL: 0 parses on the
+# blocking threads instead, "auto" starts one per core
+_parse_processes = os.getenv('PARSE_PROCESSES', '0').strip().lower()
+PARSE_PROCESSES = (os.cpu_count() or 1) if _parse_processes == 'auto' else int(_parse_processes or 0)
+# Parses queued or running at once (independent of how many fetches run); bounds the page bodies
+# waiting in memory
+PARSE_CONCURRENCY = int(os.getenv('PARSE_CONCURRENCY', '0')) or (2 * PARSE_PROCESSES or BLOCKING_THREADS)
+
+USER_AGENT = 'WebsiteChecker/1.0'
+
+
+class _HostLimiter:
+    """Caps in-flight requests per host; idle hosts are dropped so the table stays small."""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self._hosts = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._hosts[host]
+
+
+class _ResolvingTransport(httpx.AsyncHTTPTransport):
+    """The default transport, with hostnames resolved through the engine's DNS cache.
+
+    httpx has no public hook for httpcore's network backend, so this swaps the one of the
+    transport's connection pool (httpcore is pinned in requirements.txt to the versions that have
+    it). Should the pool stop having one, connections resolve on their own rather than silently
+    skipping the wrapper.
+    """
+
+    def __init__(self, resolver, **kwargs):
+        super().__init__(**kwargs)
+        backend = getattr(getattr(self, '_pool', None), '_network_backend', None)
+        if isinstance(backend, httpcore.AsyncNetworkBackend):
+            self._pool._network_backend = ResolvingBackend(resolver, backend)
+        else:
+            print("[engine] this httpcore version has no pool network backend; not using the DNS cache for "
+                  "connections", file=sys.stderr)
+
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+
+def _process_pool(processes):
+    """The parse process pool of this process (shared by all engines), started on first use."""
+    key = (os.getpid(), processes)
+    with _process_pools_lock:
+        pool = _process_pools.get(key)
+        if pool is None:
+            # Not fork: the parent has running threads (event loop, thread pool)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            pool = _process_pools[key] = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+        return pool
+
+
+class Engine:
+    """Shared, connection-pooled HTTP client plus a thread pool for blocking work.
+
+    An engine is bound to the event loop it is first used on; use get_engine() to get the
+    one for the running loop. HTML parsing goes through parse(), which uses a process pool when
+    `parse_processes` is set. Requests go through `health` (see health.py): hosts that keep
+    failing are skipped for a while, timeouts shrink to what each host needs, and transient
+    errors are retried with jittered backoff. Direct connections resolve hostnames through `resolver`
+    (cached, see dns.py); when an HTTP(S)_PROXY is configured the proxy does the resolving
+    and `resolver` is None.
+    """
+
+    def __init__(self, max_connections=HTTP_MAX_CONNECTIONS, max_keepalive=HTTP_MAX_KEEPALIVE,
+                 max_per_host=HTTP_MAX_PER_HOST, timeout=HTTP_TIMEOUT, http2=HTTP2_AVAILABLE,
+                 blocking_threads=BLOCKING_THREADS, parse_processes=PARSE_PROCESSES,
+                 parse_concurrency=PARSE_CONCURRENCY, health=None, retries=RETRY_ATTEMPTS):
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_keepalive,
+                              keepalive_expiry=30)
+        # Passing a transport turns off httpx's proxy-from-environment handling, so only do it without one
+        self.resolver = None if getproxies() else Resolver(self)
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=limits,
+            transport=_ResolvingTransport(self.resolver, http2=http2, limits=limits) if self.resolver else None,
+            timeout=timeout,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+        )
+        self._per_host = _HostLimiter(max_per_host)
+        self._blocking = ThreadPoolExecutor(max_workers=blocking_threads,
+                                            thread_name_prefix='websitechecker-blocking')
+        self._single_flight = {}
+        self.parse_processes = max(0, parse_processes)
+        self._parse_slots = asyncio.Semaphore(max(1, parse_concurrency))
+        self.health = health or host_health
+        self.retries = max(0, retries)
+
+    async def single_flight(self, key, make_coro):
+        """Runs make_coro() once per key at a time; concurrent callers for the same key share its result."""
+        task = self._single_flight.get(key)
+        if task is None:
+            task = self._single_flight[key] = asyncio.ensure_future(make_coro())
+            task.add_done_callback(lambda _: self._single_flight.pop(key, None))
+        # One caller giving up must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def get(self, url, **kwargs):
+        """GET through the shared pool, respecting the per-host cap."""
+        async with self._per_host.slot(url):
+            return await self._send(url, lambda timeout: self.client.get(url, **dict(kwargs, timeout=timeout)),
+                                    kwargs.get('timeout'))
+
+    async def head(self, url, **kwargs):
+        """HEAD through the shared pool, respecting the per-host cap."""
+        async with self._per_host.slot(url):
+            return await self._send(url, lambda timeout: self.client.head(url, **dict(kwargs, timeout=timeout)),
+                                    kwargs.get('timeout'))
+
+    @asynccontextmanager
+    async def stream(self, url, **kwargs):
+        """Streaming GET: yields the response once headers arrive; the body is read on demand.
+
+        Leaving the block without reading the body closes the stream instead of downloading it.
+        """
+        async with self._per_host.slot(url):
+            async with AsyncExitStack() as stack:
+                def open_stream(timeout):
+                    return stack.enter_async_context(self.client.stream('GET', url, **dict(kwargs, timeout=timeout)))
+
+                yield await self._send(url, open_stream, kwargs.get('timeout'))
+
+    async def _send(self, url, send, timeout):
+        """Calls send(timeout) until it returns a response, applying the host health rules."""
+        host = urlsplit(url).netloc.lower()
+        if timeout is None:
+            timeout = self.client.timeout.read
+        attempt = 0
+        while True:
+            probe = self.health.acquire(host)
+            start = time.monotonic()
+            try:
+                response = await send(self.health.timeout(host, timeout))
+            except UnresolvedHost:
+                # Says nothing about the host's health, and a retry would only hit the negative DNS cache
+                if probe:
+                    self.health.release(host)
+                raise
+            except HOST_FAILURES as e:
+                self.health.failure(host)
+                if attempt >= self.retries or not isinstance(e, TRANSIENT_ERRORS) or self.health.is_open(host):
+                    raise
+                metrics.RETRIES.inc(type=type(e).__name__)
+                await asyncio.sleep(jittered_backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                if probe:
+                    self.health.release(host)
+                raise
+            self.health.success(host, time.monotonic() - start)
+            return response
+
+    async def run_blocking(self, func, *args):
+        """Runs a blocking callable off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._blocking, func, *args)
+
+    async def parse(self, func, *args):
+        """Runs a CPU-bound parse: in the process pool when parse_processes is set (func and its
+        arguments must then be picklable, so pass bytes and get compact results back), otherwise
+        on the blocking threads."""
+        async with self._parse_slots:
+            if self.parse_processes:
+                return await asyncio.get_running_loop().run_in_executor(_process_pool(self.parse_processes),
+                                                                        func, *args)
+            return await self.run_blocking(func, *args)
+
+    async def aclose(self):
+        await self.client.aclose()
+        self._blocking.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+_engines = weakref.WeakKeyDictionary()
+
+
+def get_engine():
+    """Returns the default engine for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    engine = _engines.get(loop)
+    if engine is None:
+        engine = _engines[loop] = Engine()
+    return engine
+
+
+# --- SYNC BRIDGE (Flask routes, scripts) ---
+class _LoopThread:
+    """A single background event loop shared by all synchronous callers in the process."""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True,
+                                 name='websitechecker-loop').start()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def iterate(self, agen, buffer=256, idle=None):
+        """Consumes an async generator on the loop and yields its items synchronously.
+
+        At most `buffer` items are held between the two sides; closing the returned generator
+        cancels the producer. With `idle` set, None is yielded whenever that many seconds pass
+        without an item, so the consumer gets to run (flush, check for cancellation) meanwhile.
+        """
+        loop = self.loop
+        items = queue.Queue()
+        done = object()
+        credits = None
+
+        async def pump():
+            nonlocal credits
+            credits = asyncio.Semaphore(buffer)
+            try:
+                async for item in agen:
+                    await credits.acquire()
+                    items.put((True, item))
+            except Exception as e:
+                items.put((False, e))
+            finally:
+                await agen.aclose()
+                items.put((True, done))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                try:
+                    ok, item = items.get(timeout=idle)
+                except queue.Empty:
+                    yield None
+                    continue
+                if not ok:
+                    raise item
+                if item is done:
+                    break
+                loop.call_soon_threadsafe(credits.release)
+                yield item
+        finally:
+            future.cancel()
+
+
+_loop_thread = _LoopThread()
+
+
+def run(coro, timeout=None):
+    """Runs a coroutine on the shared background loop and returns its result."""
+    return _loop_thread.run(coro, timeout)
+
+
+def iterate(agen, buffer=256, idle=None):
+    """Synchronously iterates an async generator on the shared background loop."""
+    return _loop_thread.iterate(agen, buffer, idle)
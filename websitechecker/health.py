@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import httpx
+
+from . import metrics
+from .backoff import RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, jittered_backoff  # noqa: F401 (re-exported)
+
+# Consecutive failures (connection errors, timeouts) after which a host's circuit opens
+HOST_FAILURE_THRESHOLD = int(os.getenv('HOST_FAILURE_THRESHOLD', '5'))
+# How long an open circuit fails requests fast before letting one probe through; doubles
+# after each failed probe, up to the max
+HOST_OPEN_SECONDS = float(os.getenv('HOST_OPEN_SECONDS', '30'))
+HOST_OPEN_MAX_SECONDS = float(os.getenv('HOST_OPEN_MAX_SECONDS', '600'))
+# Adaptive timeouts: p95 of the host's recent response times x multiplier, never below the
+# minimum nor above the caller's timeout; used once a host has enough samples
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv('ADAPTIVE_TIMEOUT_MULTIPLIER', '4'))
+ADAPTIVE_TIMEOUT_MIN = float(os.getenv('ADAPTIVE_TIMEOUT_MIN', '2'))
+ADAPTIVE_TIMEOUT_SAMPLES = int(os.getenv('ADAPTIVE_TIMEOUT_SAMPLES', '5'))
+# Retries for transient errors (connection refused/reset, connect timeouts), with jittered backoff
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '2'))
+HOST_HEALTH_MAX_ENTRIES = int(os.getenv('HOST_HEALTH_MAX_ENTRIES', '10000'))
+
+# Failures that say something about the host (not e.g. an unsupported URL scheme)
+HOST_FAILURES = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+# Failures worth retrying; read timeouts aren't (a tarpit would just cost the timeout again)
+TRANSIENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadError, httpx.WriteError,
+                    httpx.RemoteProtocolError)
+
+_LATENCY_WINDOW = 50
+
+
+class HostUnavailable(httpx.TransportError):
+    """The host's circuit is open: it failed repeatedly and isn't being tried right now."""
+
+
+class _Host:
+    __slots__ = ('failures', 'open_until', 'open_seconds', 'probing', 'latencies')
+
+    def __init__(self):
+        self.failures = 0
+        self.open_until = None  # set while the circuit is open
+        self.open_seconds = HOST_OPEN_SECONDS
+        self.probing = False
+        self.latencies = deque(maxlen=_LATENCY_WINDOW)
+
+
+class HostHealth:
+    """Per-host circuit breaker and response-time tracking, shared by every engine in the process.
+
+    Closed: requests go through. After `threshold` consecutive failures the circuit opens and
+    requests fail fast with HostUnavailable; once `open_seconds` have passed, one request is let
+    through as a probe, which closes the circuit on success or re-opens it (for twice as long)
+    on failure.
+    """
+
+    def __init__(self, threshold=HOST_FAILURE_THRESHOLD, max_entries=HOST_HEALTH_MAX_ENTRIES):
+        self.threshold = max(1, threshold)
+        self.max_entries = max(1, max_entries)
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, host):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = _Host()
+            while len(self._hosts) > self.max_entries:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return entry
+
+    def acquire(self, host):
+        """Raises HostUnavailable when the host's circuit is open; returns True for a probe request."""
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None or entry.open_until is None:
+                return False
+            if entry.probing or time.monotonic() < entry.open_until:
+                metrics.HOST_CIRCUIT.inc(event='rejected')
+                raise HostUnavailable(f"{host} is failing; skipped for now")
+            entry.probing = True
+            metrics.HOST_CIRCUIT.inc(event='probe')
+            return True
+
+    def success(self, host, seconds):
+        with self._lock:
+            entry = self._entry(host)
+            entry.latencies.append(seconds)
+            entry.failures = 0
+            entry.probing = False
+            if entry.open_until is not None:
+                entry.open_until = None
+                entry.open_seconds = HOST_OPEN_SECONDS
+                metrics.HOST_CIRCUIT.inc(event='closed')
+                print(f"[health] {host} recovered", file=sys.stderr)
+
+    def failure(self, host):
+        with self._lock:
+            entry = self._entry(host)
+            entry.failures += 1
+            if entry.probing:
+                # The probe failed: stay open, for longer
+                entry.probing = False
+                entry.open_seconds = min(entry.open_seconds * 2, HOST_OPEN_MAX_SECONDS)
+                entry.open_until = time.monotonic() + entry.open_seconds
+            elif entry.open_until is None and entry.failures >= self.threshold:
+                entry.open_until = time.monotonic() + entry.open_seconds
+                metrics.HOST_CIRCUIT.inc(event='opened')
+                print(f"[health] {host} failed {entry.failures} times in a row; "
+                      f"failing fast for {entry.open_seconds:.0f}s", file=sys.stderr)
+
+    def release(self, host):
+        """Ends a probe that neither succeeded nor failed (e.g. it was cancelled)."""
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is not None:
+                entry.probing = False
+
+    def is_open(self, host):
+        with self._lock:
+            entry = self._hosts.get(host)
+            return entry is not None and entry.open_until is not None
+
+    def timeout(self, host, default):
+        """The timeout to use for a request to host: `default`, tightened to what the host needs."""
+        if not isinstance(default, (int, float)):
+            return default
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None or len(entry.latencies) < ADAPTIVE_TIMEOUT_SAMPLES:
+                return default
+            latencies = sorted(entry.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return min(default, max(ADAPTIVE_TIMEOUT_MIN, p95 * ADAPTIVE_TIMEOUT_MULTIPLIER))
+
+    def clear(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+host_health = HostHealth()
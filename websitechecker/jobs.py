@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from ._sqlite import SqliteConnection
+from .backoff import jittered_backoff
+
+
+# SQLite job store; every worker process on the host shares it
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'websitechecker-jobs.sqlite3'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+# How often idle workers look for jobs submitted by other processes
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+# Finished jobs (and their results) are deleted after this many seconds
+JOB_TTL = float(os.getenv('JOB_TTL', str(24 * 3600)))
+# Results are written (and cancellation checked) every N items or every interval, whichever is first
+JOB_FLUSH_ITEMS = int(os.getenv('JOB_FLUSH_ITEMS', '50'))
+JOB_FLUSH_INTERVAL = float(os.getenv('JOB_FLUSH_INTERVAL', '0.5'))
+# Tries at storing a job's final status before the worker gives up on it (the job then stays "running")
+JOB_FINISH_ATTEMPTS = int(os.getenv('JOB_FINISH_ATTEMPTS', '5'))
+
+FINISHED = ('done', 'failed', 'cancelled')
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, params TEXT, status TEXT, done INTEGER, '
+    'total INTEGER, error TEXT, created_at REAL, started_at REAL, finished_at REAL, cancel_requested INTEGER, '
+    'worker_pid INTEGER)',
+    'CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)',
+    'CREATE TABLE IF NOT EXISTS job_results (job_id TEXT, seq INTEGER, item TEXT, PRIMARY KEY (job_id, seq))',
+)
+
+
+class JobStore:
+    """Jobs, their progress and their results (in production order) in a SQLite file.
+
+    A job is a dict: {"id", "kind", "params", "status", "done", "total", "error", "created_at",
+    "started_at", "finished_at", "cancel_requested"}; status is queued, running, done, failed
+    or cancelled.
+    """
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = SqliteConnection(path, _SCHEMA, timeout=10)
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        (job_id, kind, params, status, done, total, error, created_at, started_at, finished_at,
+         cancel_requested) = row
+        return {"id": job_id, "kind": kind, "params": json.loads(params), "status": status, "done": done,
+                "total": total, "error": error, "created_at": created_at, "started_at": started_at,
+                "finished_at": finished_at, "cancel_requested": bool(cancel_requested)}
+
+    _COLUMNS = ('id, kind, params, status, done, total, error, created_at, started_at, finished_at, '
+                'cancel_requested')
+
+    def create(self, kind, params, total=None):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._connection().execute(
+                'INSERT INTO jobs (id, kind, params, status, done, total, created_at, cancel_requested) '
+                'VALUES (?, ?, ?, ?, 0, ?, ?, 0)', (job_id, kind, json.dumps(params), 'queued', total, time.time()))
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection().execute(f'SELECT {self._COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._job(row)
+
+    def claim(self):
+        """Marks the oldest queued job as running and returns it; None when the queue is empty."""
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute(f'SELECT {self._COLUMNS} FROM jobs WHERE status = ? '
+                                 'ORDER BY created_at LIMIT 1', ('queued',)).fetchone()
+                if row is not None:
+                    db.execute('UPDATE jobs SET status = ?, started_at = ?, worker_pid = ? WHERE id = ?',
+                               ('running', time.time(), os.getpid(), row[0]))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        job = self._job(row)
+        if job is not None:
+            job['status'] = 'running'
+        return job
+
+    def add_results(self, job_id, first_seq, items):
+        """Appends items (seq numbers from first_seq on) and bumps the job's progress; with no
+        items it only checks for cancellation.
+
+        Returns True when cancellation of the job has been requested.
+        """
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.executemany('INSERT OR REPLACE INTO job_results (job_id, seq, item) VALUES (?, ?, ?)',
+                               [(job_id, first_seq + i, json.dumps(item)) for i, item in enumerate(items)])
+                db.execute('UPDATE jobs SET done = ? WHERE id = ?', (first_seq + len(items), job_id))
+                row = db.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return bool(row and row[0])
+
+    def results(self, job_id, since=0, limit=1000):
+        """[(seq, item), ...] for results with seq >= since."""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT seq, item FROM job_results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?',
+                (job_id, since, limit)).fetchall()
+        return [(seq, json.loads(item)) for seq, item in rows]
+
+    def finish(self, job_id, status, error=None):
+        with self._lock:
+            self._connection().execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                                       (status, error, time.time(), job_id))
+
+    def cancel(self, job_id):
+        """Requests cancellation; a job that hasn't started yet is cancelled straight away.
+
+        Returns the updated job, or None if there is no such job.
+        """
+        with self._lock:
+            db = self._connection()
+            db.execute('UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?',
+                       ('cancelled', time.time(), job_id, 'queued'))
+            db.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?', (job_id, 'running'))
+        return self.get(job_id)
+
+    def requeue_orphans(self):
+        """Puts running jobs whose worker process is gone back in the queue (partial results are dropped)."""
+        with self._lock:
+            db = self._connection()
+            rows = db.execute('SELECT id, worker_pid FROM jobs WHERE status = ?', ('running',)).fetchall()
+            for job_id, pid in rows:
+                # Called before this process runs any job, so its own pid counts as gone too
+                if pid and pid != os.getpid() and _pid_alive(pid):
+                    continue
+                print(f"[jobs] requeueing interrupted job {job_id}", file=sys.stderr)
+                db.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+                db.execute('UPDATE jobs SET status = ?, done = 0, started_at = NULL, worker_pid = NULL '
+                           'WHERE id = ?', ('queued', job_id))
+
+    def prune(self, ttl=JOB_TTL):
+        cutoff = time.time() - ttl
+        with self._lock:
+            db = self._connection()
+            db.execute('DELETE FROM job_results WHERE job_id IN '
+                       '(SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?)', (*FINISHED, cutoff))
+            db.execute('DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?', (*FINISHED, cutoff))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# --- JOB RUNNERS ---
+# Each takes the job params and returns a sync iterator of JSON-serializable results, with None
+# whenever `idle` seconds pass without one (see engine.iterate). The checking code is imported
+# here rather than at module level, which keeps `import app` light.
+def _run_check(params, idle=None):
+    from .checker import CHECK_CONCURRENCY, CHECK_PER_HOST, check_urls
+    from .engine import iterate
+    results = iterate(check_urls(params['urls'], params.get('concurrency', CHECK_CONCURRENCY),
+                                 params.get('per_host', CHECK_PER_HOST), conditional=params.get('conditional')),
+                      idle=idle)
+    try:
+        for entry in results:
+            yield None if entry is None else {"index": entry[0], "result": entry[1]}
+    finally:
+        results.close()
+
+
+def _run_crawl(params, idle=None):
+    from .crawler import iter_crawl
+    from .engine import iterate
+    return iterate(iter_crawl(params['url'], params.get('max_pages', 50), params.get('max_depth'),
+                              params.get('time_budget')), idle=idle)
+
+
+def _run_audit(params, idle=None):
+    from .site_audit import iter_audit
+    from .engine import iterate
+    return iterate(iter_audit(params['url'], params.get('max_pages', 50), params.get('max_depth'),
+                              params.get('time_budget')), idle=idle)
+
+
+def _run_links(params, idle=None):
+    from .linkcheck import iter_link_check
+    from .engine import iterate
+    return iterate(iter_link_check(params['url'], params.get('max_pages', 1), params.get('max_depth'),
+                                   params.get('time_budget')), idle=idle)
+
+
+RUNNERS = {'check': _run_check, 'crawl': _run_crawl, 'audit': _run_audit, 'links': _run_links}
+
+
+class JobQueue:
+    """Runs jobs from a JobStore on a pool of worker threads.
+
+    Workers start on the first submit() (or an explicit start()). Jobs submitted by other
+    processes sharing the store are picked up too, within JOB_POLL_INTERVAL.
+    """
+
+    def __init__(self, store=None, workers=JOB_WORKERS):
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self._wake = threading.Event()
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            # Threads don't survive a fork, so a forked worker process starts its own pool
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            self.store.requeue_orphans()
+            self.store.prune()
+            for n in range(self.workers):
+                threading.Thread(target=self._work, daemon=True, name=f'websitechecker-job-{n}').start()
+
+    def submit(self, kind, params):
+        """Queues a job and returns its id. `kind` is "check" ({"urls", "concurrency", "per_host",
+        "conditional"}), "crawl", "audit" or "links" ({"url", "max_pages", "max_depth", "time_budget"})."""
+        if kind not in RUNNERS:
+            raise ValueError(f"unknown job kind {kind!r}")
+        # Unknown up front for link checks (one result per unique target)
+        total = (len(params['urls']) if kind == 'check' else None if kind == 'links'
+                 else params.get('max_pages', 50))
+        job_id = self.store.create(kind, params, total)
+        self.start()
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def results(self, job_id, since=0, limit=1000):
+        return self.store.results(job_id, since, limit)
+
+    def cancel(self, job_id):
+        return self.store.cancel(job_id)
+
+    def stream(self, job_id, since=0, poll_interval=0.5):
+        """Yields (seq, item) for results from `since` on, as they are produced, until the job ends."""
+        while True:
+            job = self.store.get(job_id)
+            batch = self.store.results(job_id, since)
+            for seq, item in batch:
+                yield seq, item
+                since = seq + 1
+            if job is None or (job['status'] in FINISHED and not batch):
+                return
+            if not batch:
+                time.sleep(poll_interval)
+
+    def _work(self):
+        failures = 0
+        while True:
+            try:
+                job = self.store.claim()
+                if job is not None:
+                    self._run(job)
+                failures = 0
+            except Exception as e:
+                # A store error (e.g. "database is locked") must not end the worker thread
+                print(f"[jobs] worker error: {e}", file=sys.stderr)
+                time.sleep(jittered_backoff(failures))
+                failures += 1
+                continue
+            if job is None:
+                self._wake.wait(JOB_POLL_INTERVAL)
+                self._wake.clear()
+
+    def _run(self, job):
+        job_id = job['id']
+        items = None
+        seq = 0
+        pending = []
+        last_flush = time.monotonic()
+        status, error = 'done', None
+        try:
+            # Woken at least every flush interval, so results and cancellation don't wait for the next item
+            items = RUNNERS[job['kind']](job['params'], idle=JOB_FLUSH_INTERVAL)
+            for item in items:
+                if item is not None:
+                    pending.append(item)
+                if len(pending) >= JOB_FLUSH_ITEMS or time.monotonic() - last_flush >= JOB_FLUSH_INTERVAL:
+                    cancelled = self.store.add_results(job_id, seq, pending)
+                    seq += len(pending)
+                    pending = []
+                    last_flush = time.monotonic()
+                    if cancelled:
+                        status = 'cancelled'
+                        break
+            if pending:
+                if self.store.add_results(job_id, seq, pending) and status == 'done':
+                    status = 'cancelled'
+        except Exception as e:
+            print(f"[jobs] job {job_id} failed: {e}", file=sys.stderr)
+            status, error = 'failed', str(e)
+        finally:
+            # Stops the producer (and its in-flight requests) when we leave early
+            if items is not None:
+                items.close()
+        for attempt in range(JOB_FINISH_ATTEMPTS):
+            try:
+                self.store.finish(job_id, status, error)
+                return
+            except sqlite3.Error as e:
+                if attempt == JOB_FINISH_ATTEMPTS - 1:
+                    raise
+                print(f"[jobs] recording the end of job {job_id} failed, retrying: {e}", file=sys.stderr)
+                time.sleep(jittered_backoff(attempt))
+
+
+job_queue = JobQueue()
@@ -0,0 +1,185 @@
+"""Broken link checking for a page or a crawled site.
+
+Every <a href>, <img src>, <script src> and <link href> found by the crawl (on any host) is a
+target. Each unique target is probed once, with HEAD; servers that answer HEAD with an error
+that says nothing about the target (405 Method Not Allowed and friends) get a GET for the first
+byte instead, whose body is never read. Internal page links wait until the crawl is over, so
+pages the crawl fetched anyway aren't requested a second time.
+"""
+import asyncio
+import os
+from urllib.parse import urlsplit
+
+from . import metrics
+from .crawler import CRAWL_CONCURRENCY, iter_crawl, normalize_url
+from .engine import get_engine
+
+# Probes running at once (on top of the engine's per-host cap)
+LINKCHECK_CONCURRENCY = int(os.getenv('LINKCHECK_CONCURRENCY', '20'))
+LINKCHECK_TIMEOUT = float(os.getenv('LINKCHECK_TIMEOUT', '10'))
+# Unique targets probed per run; further ones are only counted
+LINKCHECK_MAX_TARGETS = int(os.getenv('LINKCHECK_MAX_TARGETS', '10000'))
+# Referring pages kept per target, and broken targets listed in the summary
+LINKCHECK_SAMPLE_URLS = int(os.getenv('LINKCHECK_SAMPLE_URLS', '10'))
+LINKCHECK_MAX_FINDINGS = int(os.getenv('LINKCHECK_MAX_FINDINGS', '1000'))
+
+# HEAD answers worth a second opinion from GET: servers and CDNs that don't implement or allow HEAD
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 406, 500, 501}
+
+
+async def probe_link(url, engine=None, timeout=LINKCHECK_TIMEOUT):
+    """Status of a link target: {"url", "status", "ok", "method"}, plus "final_url" when it
+    redirects and "error" when it couldn't be fetched (status None)."""
+    engine = engine or get_engine()
+    result = {"url": url, "status": None, "ok": False, "method": "HEAD"}
+    try:
+        response = await engine.head(url, timeout=timeout)
+        if response.status_code in HEAD_FALLBACK_STATUSES:
+            result['method'] = 'GET'
+            async with engine.stream(url, timeout=timeout, headers={'Range': 'bytes=0-0'}) as response:
+                pass  # Status and headers are all we need
+        result['status'] = response.status_code
+        result['ok'] = response.status_code < 400
+        if str(response.url) != url:
+            result['final_url'] = str(response.url)
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+    metrics.LINK_PROBES.inc(method=result['method'],
+                            result='error' if 'error' in result else 'ok' if result['ok'] else 'broken')
+    return result
+
+
+class LinkChecker:
+    """Probes the targets of crawled pages, each unique target once, `concurrency` at a time.
+
+    Feed it pages from iter_crawl(..., targets=True) with add(); probe results arrive on
+    `results` as they finish. finish() is called once the crawl is over: it resolves the
+    deferred internal links (from the crawl where it fetched them, by probing otherwise).
+    """
+
+    def __init__(self, start_url, engine=None, concurrency=LINKCHECK_CONCURRENCY, max_targets=LINKCHECK_MAX_TARGETS,
+                 sample_urls=LINKCHECK_SAMPLE_URLS, max_findings=LINKCHECK_MAX_FINDINGS, defer_internal=True):
+        self.engine = engine or get_engine()
+        self.base_netloc = urlsplit(normalize_url(start_url)).netloc
+        self.max_targets = max_targets
+        self.sample_urls = sample_urls
+        self.max_findings = max_findings
+        self.defer_internal = defer_internal
+        self.results = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._targets = {}  # url -> {"tag", "links", "referrers", "result"}
+        self._deferred = []
+        self._crawled = {}  # normalized crawled URL -> status
+        self._tasks = set()
+        self.pending = 0  # probes started whose result isn't on `results` yet
+        self.pages = 0
+        self.links = 0
+        self.unchecked = 0
+        self.ok = 0
+        self.broken = 0
+
+    def add(self, page):
+        """Adds one crawled page ({"url", "status", "targets"})."""
+        self.pages += 1
+        self._crawled[page['url']] = page['status']
+        for tag, url in page.get('targets') or ():
+            self.links += 1
+            entry = self._targets.get(url)
+            if entry is None:
+                if len(self._targets) >= self.max_targets:
+                    self.unchecked += 1
+                    continue
+                entry = self._targets[url] = {"tag": tag, "links": 0, "referrers": [], "result": None}
+                if self.defer_internal and tag == 'a' and urlsplit(url).netloc.lower() == self.base_netloc:
+                    self._deferred.append(url)
+                else:
+                    self._probe(url)
+            entry['links'] += 1
+            if len(entry['referrers']) < self.sample_urls:
+                entry['referrers'].append(page['url'])
+
+    def finish(self):
+        """Resolves the deferred internal links; call once no more pages are coming."""
+        for url in self._deferred:
+            status = self._crawled.get(normalize_url(url), False)
+            if status is False:
+                self._probe(url)
+            else:
+                # Already fetched by the crawl (status None: it failed to load)
+                self._done(url, {"url": url, "status": status, "ok": status is not None and status < 400,
+                                 "method": "GET"})
+        self._deferred = []
+
+    def _probe(self, url):
+        self.pending += 1
+
+        async def probe():
+            async with self._slots:
+                result = await probe_link(url, self.engine)
+            self.pending -= 1
+            self._done(url, result)
+
+        task = asyncio.ensure_future(probe())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _done(self, url, result):
+        entry = self._targets[url]
+        entry['result'] = result
+        if result['ok']:
+            self.ok += 1
+        else:
+            self.broken += 1
+        self.results.put_nowait(dict(result, tag=entry['tag'], referrer=entry['referrers'][0]))
+
+    def result(self):
+        """The link check summary so far."""
+        broken = [dict(entry['result'], tag=entry['tag'], links=entry['links'], referrers=entry['referrers'])
+                  for entry in self._targets.values() if entry['result'] is not None and not entry['result']['ok']]
+        broken.sort(key=lambda e: -e['links'])
+        return {
+            "pages": self.pages,
+            "links": self.links,
+            "targets": len(self._targets) + self.unchecked,
+            "ok": self.ok,
+            "broken": {"targets": self.broken, "examples": broken[:self.max_findings]},
+            # Targets past LINKCHECK_MAX_TARGETS, never probed
+            "unchecked_targets": self.unchecked,
+        }
+
+    def cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+
+async def iter_link_check(start_url, max_pages=1, max_depth=None, time_budget=None,
+                          concurrency=LINKCHECK_CONCURRENCY, engine=None):
+    """Checks every link and resource on a page (max_pages=1) or a crawled site.
+
+    Yields each target's probe result ({"url", "status", "ok", "method", "tag", "referrer", ...})
+    as it finishes, then {"summary": LinkChecker.result()} with the broken targets and the
+    pages linking to them. `time_budget` limits the crawl; the probes it found still run.
+    """
+    engine = engine or get_engine()
+    checker = LinkChecker(start_url, engine, concurrency, defer_internal=max_pages > 1)
+    try:
+        async for page in iter_crawl(start_url, max_pages, max_depth, time_budget, CRAWL_CONCURRENCY, engine,
+                                     targets=True):
+            checker.add(page)
+            while not checker.results.empty():
+                yield checker.results.get_nowait()
+        checker.finish()
+        while checker.pending or not checker.results.empty():
+            yield await checker.results.get()
+        yield {"summary": checker.result()}
+    finally:
+        checker.cancel()
+
+
+async def check_links(start_url, max_pages=1, max_depth=None, time_budget=None,
+                      concurrency=LINKCHECK_CONCURRENCY, engine=None):
+    """Link-checks a page or site, returning only the summary."""
+    summary = None
+    async for item in iter_link_check(start_url, max_pages, max_depth, time_budget, concurrency, engine):
+        summary = item.get('summary', summary)
+    return summary
@@ -0,0 +1,146 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond parses up to slow WHOIS fallbacks and fetch timeouts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self, key, value):
+        counts, total, count = value
+        lines = []
+        for bound, n in zip(self.buckets + ('+Inf',), counts + [count]):
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [le])} {n}")
+        lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics of this process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'websitechecker_stage_seconds', 'Time spent per check stage (connect, tls, ttfb, download, parse, whois, total).',
+    ['stage'])
+CHECKS = registry.counter('websitechecker_checks_total', 'URL checks by outcome.', ['outcome'])
+ERRORS = registry.counter('websitechecker_errors_total', 'Errors by where they happened and their type.',
+                          ['stage', 'type'])
+DOMAIN_LOOKUPS = registry.counter(
+    'websitechecker_domain_lookups_total',
+    'Domain info lookups by provider (cache, whois, rdap, whoisxmlapi) and result (hit, miss, error, cancelled).',
+    ['provider', 'result'])
+HOST_CIRCUIT = registry.counter('websitechecker_host_circuit_total',
+                                'Per-host circuit breaker events (opened, rejected, probe, closed).', ['event'])
+RETRIES = registry.counter('websitechecker_retries_total', 'Requests retried after a transient error, by error type.',
+                           ['type'])
+DNS_LOOKUPS = registry.counter('websitechecker_dns_lookups_total',
+                               'Hostname resolutions by cache result (hit, negative_hit, miss).', ['result'])
+LINK_PROBES = registry.counter('websitechecker_link_probes_total',
+                               'Link check probes by method (HEAD, GET) and result (ok, broken, error).',
+                               ['method', 'result'])
+
+# Content type for the /metrics response
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def observe_timings(timings):
+    """Records a check's {"<stage>_ms": ms} timings in the stage histogram."""
+    for key, ms in timings.items():
+        if ms is not None and key.endswith('_ms'):
+            STAGE_SECONDS.observe(ms / 1000, stage=key[:-3])
+
+
+@contextmanager
+def timed(timings, stage):
+    """Adds the time spent in the block to timings["<stage>_ms"]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        key = f"{stage}_ms"
+        timings[key] = (timings.get(key) or 0) + (time.perf_counter() - start) * 1000
@@ -0,0 +1,334 @@
+"""Scheduled monitoring: re-checks a stored set of URLs every interval and reports what changed.
+
+Each URL gets a fixed slot in the interval (from a hash of the URL), so a large set is checked
+at an even rate rather than in bursts, and each check is delayed by a random jitter past its slot. The latest
+state of every URL (status, seo_score, domain expiry) is kept in SQLite; a history row is only
+written when one of those changes, so an unchanged result costs one comparison and one UPDATE.
+Changes are emitted as events to the sinks (JSONL file, webhook):
+
+    {"type": "status_changed", "url", "old", "new", "at"}
+    {"type": "seo_score_changed", "url", "old", "new", "at"}
+    {"type": "expiry_changed", "url", "domain", "old", "new", "at"}        (e.g. renewed)
+    {"type": "domain_expiring", "url", "domain", "expires_on", "days_left", "threshold", "at"}
+
+A URL's first check only records its baseline (and any expiry alert). Run it with
+`python -m websitechecker monitor run` (see cli.py).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from .checker import check_url
+from .engine import get_engine
+from .health import jittered_backoff
+from ._sqlite import SqliteConnection
+from .results import CheckResult
+
+MONITOR_DB_PATH = os.getenv('MONITOR_DB_PATH', os.path.join(tempfile.gettempdir(), 'websitechecker-monitor.sqlite3'))
+# Seconds between two checks of the same URL
+MONITOR_INTERVAL = float(os.getenv('MONITOR_INTERVAL', str(24 * 3600)))
+# Random delay of each check past its slot, as a fraction of the interval
+MONITOR_JITTER = float(os.getenv('MONITOR_JITTER', '0.02'))
+MONITOR_CONCURRENCY = int(os.getenv('MONITOR_CONCURRENCY', '50'))
+# How often due URLs are picked up (and finished results recorded)
+MONITOR_TICK = float(os.getenv('MONITOR_TICK', '1'))
+# Days-before-expiry at which a domain_expiring event fires (once per threshold per expiry date)
+MONITOR_EXPIRY_DAYS = sorted((int(days) for days in os.getenv('MONITOR_EXPIRY_DAYS', '30,7,1').split(',')
+                              if days.strip()), reverse=True)
+# Smallest seo_score change reported
+MONITOR_SEO_DELTA = int(os.getenv('MONITOR_SEO_DELTA', '1'))
+# History rows older than this are pruned when the monitor starts
+MONITOR_HISTORY_DAYS = float(os.getenv('MONITOR_HISTORY_DAYS', '90'))
+MONITOR_WEBHOOK_TIMEOUT = float(os.getenv('MONITOR_WEBHOOK_TIMEOUT', '10'))
+MONITOR_WEBHOOK_RETRIES = int(os.getenv('MONITOR_WEBHOOK_RETRIES', '3'))
+
+_DAY = 86400
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS monitored (url TEXT PRIMARY KEY, slot REAL, next_due REAL, checked_at REAL, '
+    'status TEXT, seo_score INTEGER, expires_on REAL, expiry_alert INTEGER)',
+    'CREATE INDEX IF NOT EXISTS monitored_due ON monitored (next_due)',
+    'CREATE TABLE IF NOT EXISTS history (url TEXT, checked_at REAL, status TEXT, seo_score INTEGER, expires_on REAL)',
+    'CREATE INDEX IF NOT EXISTS history_url ON history (url, checked_at)',
+)
+
+
+def slot(url):
+    """The URL's fixed position in the interval, in [0, 1)."""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big') / 2 ** 64
+
+
+def next_due(url_slot, interval, now, jitter=MONITOR_JITTER):
+    """Time of the URL's next slot after now, pushed back by up to jitter * interval."""
+    due = now + (url_slot * interval - now) % interval
+    return due + random.uniform(0, jitter) * interval if jitter > 0 else due
+
+
+class MonitorStore:
+    """Monitored URLs, their latest state and the history of their changes, in a SQLite file."""
+
+    def __init__(self, path=MONITOR_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = SqliteConnection(path, _SCHEMA, timeout=10)
+
+    def add(self, urls, interval=MONITOR_INTERVAL):
+        """Starts monitoring URLs (already monitored ones are left as they are); returns how many are new."""
+        now = time.time()
+        rows = []
+        for url in urls:
+            url_slot = slot(url)
+            rows.append((url, url_slot, next_due(url_slot, interval, now)))
+        with self._lock:
+            db = self._connection()
+            before = db.total_changes
+            db.execute('BEGIN')
+            db.executemany('INSERT OR IGNORE INTO monitored (url, slot, next_due) VALUES (?, ?, ?)', rows)
+            db.execute('COMMIT')
+            return db.total_changes - before
+
+    def remove(self, urls):
+        with self._lock:
+            db = self._connection()
+            before = db.total_changes
+            db.execute('BEGIN')
+            db.executemany('DELETE FROM monitored WHERE url = ?', [(url,) for url in urls])
+            db.executemany('DELETE FROM history WHERE url = ?', [(url,) for url in urls])
+            db.execute('COMMIT')
+            return db.total_changes - before
+
+    def claim_due(self, now, limit, interval, jitter=MONITOR_JITTER):
+        """Due URLs (at most limit) with their stored state; their next check is scheduled at once,
+        so other monitor processes sharing the file don't pick them up too."""
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                rows = db.execute('SELECT url, slot, status, seo_score, expires_on, expiry_alert FROM monitored '
+                                  'WHERE next_due <= ? ORDER BY next_due LIMIT ?', (now, limit)).fetchall()
+                db.executemany('UPDATE monitored SET next_due = ? WHERE url = ?',
+                               [(next_due(row[1], interval, now, jitter), row[0]) for row in rows])
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return [{"url": url, "status": status, "seo_score": seo_score, "expires_on": expires_on,
+                 "expiry_alert": expiry_alert} for url, _, status, seo_score, expires_on, expiry_alert in rows]
+
+    def release(self, urls):
+        """Makes claimed URLs whose check didn't finish due again."""
+        with self._lock:
+            self._connection().executemany('UPDATE monitored SET next_due = ? WHERE url = ?',
+                                           [(time.time(), url) for url in urls])
+
+    def record(self, states, changes):
+        """Saves checked states [(checked_at, status, seo_score, expires_on, expiry_alert, url)] and
+        history rows for the changed ones [(url, checked_at, status, seo_score, expires_on)]."""
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN')
+            try:
+                db.executemany('UPDATE monitored SET checked_at = ?, status = ?, seo_score = ?, expires_on = ?, '
+                               'expiry_alert = ? WHERE url = ?', states)
+                db.executemany('INSERT INTO history (url, checked_at, status, seo_score, expires_on) '
+                               'VALUES (?, ?, ?, ?, ?)', changes)
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+
+    def history(self, url, limit=100):
+        """The URL's most recent changes, newest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT checked_at, status, seo_score, expires_on FROM history WHERE url = ? '
+                'ORDER BY checked_at DESC LIMIT ?', (url, limit)).fetchall()
+        return [{"checked_at": checked_at, "status": status, "seo_score": seo_score, "expires_on": expires_on}
+                for checked_at, status, seo_score, expires_on in rows]
+
+    def summary(self):
+        """{"urls", "checked", "next_due", "statuses": {status: count}}."""
+        with self._lock:
+            db = self._connection()
+            urls, checked, due = db.execute('SELECT COUNT(*), COUNT(checked_at), MIN(next_due) '
+                                            'FROM monitored').fetchone()
+            statuses = dict(db.execute('SELECT status, COUNT(*) FROM monitored WHERE status IS NOT NULL '
+                                       'GROUP BY status').fetchall())
+        return {"urls": urls, "checked": checked, "next_due": due, "statuses": statuses}
+
+    def prune(self, days=MONITOR_HISTORY_DAYS):
+        with self._lock:
+            self._connection().execute('DELETE FROM history WHERE checked_at < ?', (time.time() - days * _DAY,))
+
+
+def _date_text(timestamp):
+    return time.strftime('%Y-%m-%d', time.gmtime(timestamp))
+
+
+def diff(previous, result, now, expiry_days=MONITOR_EXPIRY_DAYS, seo_delta=MONITOR_SEO_DELTA):
+    """(events, expiry_alert) for a CheckResult against the URL's stored state."""
+    events = []
+    url = previous['url']
+    seo_score = result.seo.seo_score if result.seo else None
+    domain = result.domain.domain if result.domain else None
+    expires_on = result.domain.expires_on if result.domain else None
+    baseline = previous['status'] is None
+
+    if not baseline and result.status != previous['status']:
+        events.append({"type": "status_changed", "url": url, "old": previous['status'], "new": result.status})
+    if (not baseline and seo_score is not None and previous['seo_score'] is not None
+            and abs(seo_score - previous['seo_score']) >= seo_delta):
+        events.append({"type": "seo_score_changed", "url": url, "old": previous['seo_score'], "new": seo_score})
+
+    alert = previous['expiry_alert']
+    # When the lookup failed this time, what was known is kept
+    if expires_on is not None:
+        if previous['expires_on'] is not None and expires_on != previous['expires_on']:
+            events.append({"type": "expiry_changed", "url": url, "domain": domain,
+                           "old": _date_text(previous['expires_on']), "new": _date_text(expires_on)})
+            alert = None
+        days_left = (expires_on - now) / _DAY
+        crossed = [days for days in expiry_days if days_left <= days]
+        if crossed and (alert is None or crossed[-1] < alert):
+            alert = crossed[-1]
+            events.append({"type": "domain_expiring", "url": url, "domain": domain,
+                           "expires_on": _date_text(expires_on), "days_left": round(days_left, 1),
+                           "threshold": alert})
+    for event in events:
+        event['at'] = now
+    return events, alert
+
+
+# --- SINKS ---
+class FileSink:
+    """Appends events to a JSONL file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def emit(self, events):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+
+
+class WebhookSink:
+    """POSTs {"events": [...]} to a URL, retrying failures with jittered backoff."""
+
+    def __init__(self, url, engine=None, timeout=MONITOR_WEBHOOK_TIMEOUT, retries=MONITOR_WEBHOOK_RETRIES):
+        self.url = url
+        self.engine = engine
+        self.timeout = timeout
+        self.retries = max(0, retries)
+
+    async def emit(self, events):
+        client = (self.engine or get_engine()).client
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.post(self.url, json={"events": events}, timeout=self.timeout)
+                if response.status_code < 500:
+                    if response.status_code >= 400:
+                        print(f"[monitor] webhook {self.url} rejected {len(events)} events: {response.status_code}",
+                              file=sys.stderr)
+                    return
+                error = f"HTTP {response.status_code}"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.retries:
+                await asyncio.sleep(jittered_backoff(attempt))
+        print(f"[monitor] webhook {self.url} failed, {len(events)} events dropped: {error}", file=sys.stderr)
+
+
+class Monitor:
+    """Checks the store's due URLs, at most `concurrency` at a time, and emits the changes.
+
+    run() loops until cancelled (or for `duration` seconds); every `tick` seconds it records the
+    finished checks, sends their events to the sinks and starts the URLs that have come due.
+    """
+
+    def __init__(self, store=None, sinks=(), interval=MONITOR_INTERVAL, jitter=MONITOR_JITTER,
+                 concurrency=MONITOR_CONCURRENCY, tick=MONITOR_TICK, engine=None, conditional=True):
+        self.store = store or MonitorStore()
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = max(1, concurrency)
+        self.tick = tick
+        self.engine = engine
+        # Conditional re-checks: unchanged pages are answered from page_cache (304 / same body hash)
+        self.conditional = conditional
+        self._in_flight = {}  # task -> previous state
+        self._finished = []
+        self.checked = 0
+        self.events = 0
+
+    async def run(self, duration=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration if duration else None
+        self.store.prune()
+        try:
+            while deadline is None or loop.time() < deadline:
+                await self.step()
+                await asyncio.sleep(self.tick)
+        finally:
+            unfinished = [previous['url'] for task, previous in self._in_flight.items() if not task.done()]
+            for task in self._in_flight:
+                task.cancel()
+            self.store.release(unfinished)
+            await self._flush()
+
+    async def step(self):
+        """Records finished checks and starts the due ones."""
+        await self._flush()
+        capacity = self.concurrency - len(self._in_flight)
+        if capacity <= 0:
+            return
+        engine = self.engine or get_engine()
+        for previous in self.store.claim_due(time.time(), capacity, self.interval, self.jitter):
+            task = asyncio.ensure_future(self._check(previous['url'], engine))
+            self._in_flight[task] = previous
+            task.add_done_callback(self._done)
+
+    async def _check(self, url, engine):
+        try:
+            return CheckResult.from_dict(await check_url(url, engine, self.conditional))
+        except Exception as e:
+            print(f"[monitor] check failed for {url}: {e}", file=sys.stderr)
+            return CheckResult(url=url, status="Check Failed", checked_at=time.time())
+
+    def _done(self, task):
+        previous = self._in_flight.pop(task)
+        if not task.cancelled():
+            self._finished.append((previous, task.result()))
+
+    async def _flush(self):
+        if not self._finished:
+            return
+        finished, self._finished = self._finished, []
+        states, changes, events = [], [], []
+        for previous, result in finished:
+            url_events, alert = diff(previous, result, result.checked_at)
+            seo_score = result.seo.seo_score if result.seo else None
+            expires_on = result.domain.expires_on if result.domain else None
+            if expires_on is None:
+                expires_on = previous['expires_on']
+            state = (result.status, seo_score, expires_on)
+            states.append((result.checked_at, *state, alert, previous['url']))
+            if state != (previous['status'], previous['seo_score'], previous['expires_on']):
+                changes.append((previous['url'], result.checked_at, *state))
+            events.extend(url_events)
+        self.store.record(states, changes)
+        self.checked += len(finished)
+        if events:
+            self.events += len(events)
+            for sink in self.sinks:
+                try:
+                    await sink.emit(events)
+                except Exception as e:
+                    print(f"[monitor] {type(sink).__name__} failed: {e}", file=sys.stderr)
@@ -0,0 +1,80 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from ._sqlite import SqliteConnection
+
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '100000'))
+# Optional SQLite file so conditional re-checks work across runs and workers
+PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH')
+
+_SCHEMA = ('CREATE TABLE IF NOT EXISTS page_state (url TEXT PRIMARY KEY, value TEXT)',)
+
+
+class PageCache:
+    """Last seen validators, body hash and SEO result per URL, for conditional re-checks.
+
+    Records are dicts: {"etag", "last_modified", "body_hash", "hashed_bytes", "complete",
+    "status_code", "seo", "checked_at"}. Kept in an LRU in memory and, when `path` is set,
+    in SQLite.
+    """
+
+    def __init__(self, max_entries=PAGE_CACHE_MAX_ENTRIES, path=PAGE_CACHE_PATH):
+        self.max_entries = max(1, max_entries)
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = SqliteConnection(path, _SCHEMA, timeout=5)
+
+    def _remember(self, url, record):
+        self._entries[url] = record
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, url):
+        with self._lock:
+            record = self._entries.get(url)
+            if record is not None:
+                self._entries.move_to_end(url)
+                return record
+            if not self.path:
+                return None
+            try:
+                row = self._connection().execute('SELECT value FROM page_state WHERE url = ?', (url,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"[page-cache] read failed for {url}: {e}", file=sys.stderr)
+                return None
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            self._remember(url, record)
+            return record
+
+    def set(self, url, record):
+        record = dict(record, checked_at=time.time())
+        with self._lock:
+            self._remember(url, record)
+            if not self.path:
+                return
+            try:
+                self._connection().execute('INSERT OR REPLACE INTO page_state (url, value) VALUES (?, ?)',
+                                           (url, json.dumps(record)))
+            except sqlite3.Error as e:
+                print(f"[page-cache] write failed for {url}: {e}", file=sys.stderr)
+
+    def delete(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+            if self.path:
+                try:
+                    self._connection().execute('DELETE FROM page_state WHERE url = ?', (url,))
+                except sqlite3.Error as e:
+                    print(f"[page-cache] delete failed for {url}: {e}", file=sys.stderr)
+
+
+page_cache = PageCache()
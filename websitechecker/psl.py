@@ -0,0 +1,112 @@
+"""Public suffix lookups (registrable domains) from a bundled snapshot of the Public Suffix List.
+
+Only the ICANN section is used (like tldextract's default), so example.github.io's registrable
+domain is github.io. The snapshot is precompiled to JSON and loaded on first use; nothing is
+fetched over the network. To refresh it from a newer list:
+
+    python -m websitechecker.psl public_suffix_list.dat
+"""
+import json
+import os
+import sys
+import threading
+
+# Precompiled snapshot ({"version", "rules", "wildcards", "exceptions"}); PSL_SNAPSHOT_PATH overrides it
+PSL_SNAPSHOT_PATH = os.getenv('PSL_SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 'data', 'public_suffix_list.json'))
+
+_table = None
+_lock = threading.Lock()
+
+
+def compile_list(text):
+    """Snapshot dict from the text of public_suffix_list.dat (ICANN section only)."""
+    version = None
+    rules, wildcards, exceptions = set(), set(), set()
+    in_icann = False
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('// VERSION:'):
+            version = line.split(':', 1)[1].strip()
+        elif line.startswith('// ===BEGIN ICANN DOMAINS==='):
+            in_icann = True
+        elif line.startswith('// ===END ICANN DOMAINS==='):
+            in_icann = False
+        elif in_icann and line and not line.startswith('//'):
+            rule = line.split()[0].lower()
+            if rule.startswith('!'):
+                exceptions.add(rule[1:])
+            elif rule.startswith('*.'):
+                wildcards.add(rule[2:])
+            else:
+                rules.add(rule)
+    return {"version": version, "rules": sorted(rules), "wildcards": sorted(wildcards),
+            "exceptions": sorted(exceptions)}
+
+
+def _load():
+    global _table
+    with _lock:
+        if _table is None:
+            with open(PSL_SNAPSHOT_PATH, encoding='utf-8') as f:
+                data = json.load(f)
+            _table = (frozenset(data['rules']), frozenset(data['wildcards']), frozenset(data['exceptions']))
+    return _table
+
+
+def _decode(label):
+    # Rules are stored in Unicode; hostnames usually arrive as punycode
+    if label.startswith('xn--'):
+        try:
+            return label.encode('ascii').decode('idna')
+        except UnicodeError:
+            pass
+    return label
+
+
+def split_host(host):
+    """(labels before the public suffix, public suffix) for a hostname, as written.
+
+    The suffix is '' when the host has no known public suffix (IP addresses, unknown TLDs).
+    """
+    rules, wildcards, exceptions = _table or _load()
+    labels = host.lower().rstrip('.').split('.')
+    decoded = [_decode(label) for label in labels]
+    # The longest matching rule wins; exceptions beat the wildcard that covers them
+    for i in range(len(labels)):
+        candidate = '.'.join(decoded[i:])
+        if candidate in exceptions:
+            i += 1
+            break
+        if candidate in rules or (i + 1 < len(labels) and '.'.join(decoded[i + 1:]) in wildcards):
+            break
+    else:
+        return labels, ''
+    return labels[:i], '.'.join(labels[i:])
+
+
+def registrable_domain(host):
+    """example.co.uk for www.shop.example.co.uk, or None when there isn't one."""
+    if not host:
+        return None
+    prefix, suffix = split_host(host)
+    if not suffix or not prefix or not prefix[-1]:
+        return None
+    return f"{prefix[-1]}.{suffix}"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print(__doc__.strip().splitlines()[-1].strip(), file=sys.stderr)
+        return 2
+    with open(argv[0], encoding='utf-8') as f:
+        data = compile_list(f.read())
+    with open(PSL_SNAPSHOT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"[psl] {PSL_SNAPSHOT_PATH}: {len(data['rules'])} rules, version {data['version']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from . import metrics
+from .engine import get_engine
+from .health import jittered_backoff
+
+# IANA's RDAP bootstrap registry for domains: which registry's RDAP server answers for each TLD
+RDAP_BOOTSTRAP_URL = os.getenv('RDAP_BOOTSTRAP_URL', 'https://data.iana.org/rdap/dns.json')
+# Local copy of the bootstrap file, refreshed in the background once it is older than the TTL
+RDAP_BOOTSTRAP_PATH = os.getenv('RDAP_BOOTSTRAP_PATH',
+                                os.path.join(tempfile.gettempdir(), 'websitechecker-rdap-dns.json'))
+RDAP_BOOTSTRAP_TTL = float(os.getenv('RDAP_BOOTSTRAP_TTL', str(7 * 24 * 3600)))
+# Bundled subset (common TLDs, "subset": true, no publication date) used until a download succeeds,
+# e.g. when IANA isn't reachable; it is never taken for a fresh copy
+RDAP_BOOTSTRAP_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'rdap_dns.json')
+# RDAP base URL for TLDs the bootstrap file doesn't cover (rdap.org redirects to the registry)
+RDAP_FALLBACK_URL = os.getenv('RDAP_URL', 'https://rdap.org/')
+# Per-registry rate limit (token bucket) and 429 handling
+RDAP_REGISTRY_RPS = float(os.getenv('RDAP_REGISTRY_RPS', '5'))
+RDAP_REGISTRY_BURST = int(os.getenv('RDAP_REGISTRY_BURST', '10'))
+RDAP_MAX_RETRIES = int(os.getenv('RDAP_MAX_RETRIES', '3'))
+RDAP_BACKOFF_BASE = float(os.getenv('RDAP_BACKOFF_BASE', '1'))
+RDAP_BACKOFF_MAX = float(os.getenv('RDAP_BACKOFF_MAX', '60'))
+RDAP_TIMEOUT = float(os.getenv('RDAP_TIMEOUT', '10'))
+
+# A failed bootstrap download is retried after this long rather than on every lookup
+_REFRESH_RETRY_INTERVAL = 3600
+
+
+class Bootstrap:
+    """TLD -> RDAP base URL table from an IANA bootstrap file ({"services": [[tlds, urls], ...]})."""
+
+    def __init__(self, data=None):
+        self.bases = {}
+        self.publication = None
+        self.subset = False
+        if data:
+            self.publication = data.get('publication')
+            self.subset = bool(data.get('subset'))
+            for tlds, urls in data.get('services', []):
+                # Prefer HTTPS when a registry lists several endpoints
+                urls = sorted(urls, key=lambda u: not u.startswith('https:'))
+                if urls:
+                    for tld in tlds:
+                        self.bases[tld.lower()] = urls[0]
+
+    def base_url(self, domain):
+        """The registry's RDAP base URL for a domain (longest matching suffix), or None."""
+        labels = domain.lower().rstrip('.').split('.')
+        for i in range(1, len(labels)):
+            base = self.bases.get('.'.join(labels[i:]))
+            if base:
+                return base
+        return None
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _Bootstrapper:
+    """Loads the bootstrap table from the local copy (or the bundled snapshot) and keeps it fresh.
+
+    Lookups never wait on IANA: a stale or missing local copy is refreshed in the background
+    while the best table at hand is used.
+    """
+
+    def __init__(self):
+        self.table = None
+        self._next_refresh = 0
+        self._refreshing = None
+
+    def get(self, engine):
+        if self.table is None:
+            data = _read_json(RDAP_BOOTSTRAP_PATH)
+            fresh = False
+            # Only a complete, dated copy counts as fresh; anything else is refreshed straight away
+            if data and data.get('publication') and not data.get('subset'):
+                try:
+                    fresh = time.time() - os.path.getmtime(RDAP_BOOTSTRAP_PATH) < RDAP_BOOTSTRAP_TTL
+                except OSError:
+                    pass
+            if not data:
+                data = _read_json(RDAP_BOOTSTRAP_SNAPSHOT)
+            self.table = Bootstrap(data)
+            if fresh:
+                self._next_refresh = time.time() + RDAP_BOOTSTRAP_TTL
+        if time.time() >= self._next_refresh and self._refreshing is None:
+            self._next_refresh = time.time() + _REFRESH_RETRY_INTERVAL
+            self._refreshing = asyncio.ensure_future(self._refresh(engine))
+        return self.table
+
+    async def _refresh(self, engine):
+        try:
+            response = await engine.client.get(RDAP_BOOTSTRAP_URL, timeout=RDAP_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+            table = Bootstrap(data)
+            if not table.bases:
+                raise ValueError("no services in bootstrap file")
+            # Written atomically, as other worker processes may be reading it
+            directory = os.path.dirname(os.path.abspath(RDAP_BOOTSTRAP_PATH))
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+                json.dump(data, f)
+            os.replace(f.name, RDAP_BOOTSTRAP_PATH)
+            self.table = table
+            self._next_refresh = time.time() + RDAP_BOOTSTRAP_TTL
+            print(f"[rdap] bootstrap refreshed ({len(table.bases)} TLDs, published {table.publication or 'unknown'})",
+                  file=sys.stderr)
+        except Exception as e:
+            print(f"[rdap] bootstrap refresh failed, using {len(self.table.bases)} cached TLDs: {e}", file=sys.stderr)
+        finally:
+            self._refreshing = None
+
+
+_bootstrapper = _Bootstrapper()
+
+
+class _TokenBucket:
+    """Per-registry request pacing; a 429 pauses the whole registry, not just the one request."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.rate <= 0:
+                return
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After')
+    if value and value.strip().isdigit():
+        return float(value.strip())
+    return None
+
+
+class RdapClient:
+    """Queries each domain's authoritative RDAP server directly, found via the IANA bootstrap file.
+
+    Requests go through the engine's pooled client (kept-alive connections per registry host),
+    paced by a token bucket per registry. A 429 (or 503 with Retry-After) pauses that registry
+    for Retry-After, or an exponential, jittered backoff, and the query is retried.
+    """
+
+    def __init__(self, engine=None, rate=RDAP_REGISTRY_RPS, burst=RDAP_REGISTRY_BURST):
+        self.engine = engine or get_engine()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+
+    def url_for(self, domain):
+        base = _bootstrapper.get(self.engine).base_url(domain) or RDAP_FALLBACK_URL
+        return f"{base.rstrip('/')}/domain/{domain}"
+
+    async def query(self, domain):
+        """GETs the domain's RDAP record and returns the response (after retrying throttled attempts)."""
+        url = self.url_for(domain)
+        registry = urlsplit(url).netloc.lower()
+        bucket = self._buckets.get(registry)
+        if bucket is None:
+            bucket = self._buckets[registry] = _TokenBucket(self.rate, self.burst)
+
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            response = await self.engine.get(url, timeout=RDAP_TIMEOUT,
+                                             headers={'Accept': 'application/rdap+json, application/json'})
+            throttled = response.status_code == 429 or (response.status_code == 503 and _retry_after(response))
+            if not throttled or attempt >= RDAP_MAX_RETRIES:
+                return response
+            delay = _retry_after(response)
+            if delay is None:
+                delay = jittered_backoff(attempt, RDAP_BACKOFF_BASE, RDAP_BACKOFF_MAX)
+            delay = min(delay, RDAP_BACKOFF_MAX)
+            metrics.ERRORS.inc(stage='rdap', type=f"HTTP{response.status_code}")
+            print(f"[rdap] {registry} throttled ({response.status_code}), backing off {delay:.1f}s", file=sys.stderr)
+            bucket.pause(delay)
+            attempt += 1
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_rdap_client(engine=None):
+    """The RdapClient for an engine (by default the running loop's), created on first use."""
+    engine = engine or get_engine()
+    client = _clients.get(engine)
+    if client is None:
+        client = _clients[engine] = RdapClient(engine)
+    return client
@@ -0,0 +1,287 @@
+"""Compact check results and columnar export.
+
+check_url returns a nested dict (the JSON API's shape). For large batches CheckResult holds the
+same data in slotted dataclasses: numeric durations (ms), timings and dates (Unix seconds, UTC),
+and interned repeated strings (statuses, registrars, grades). ColumnarWriter writes results as
+Parquet or Arrow IPC when pyarrow is installed, and as CSV otherwise.
+"""
+import calendar
+import csv
+import importlib
+import sys
+import time
+from dataclasses import dataclass
+
+# Per-stage timings reported by check_url, in milliseconds. dns is None when a proxy resolves
+# hostnames (DNS time is then part of connect/ttfb).
+STAGES = ('dns', 'connect', 'tls', 'ttfb', 'download', 'parse', 'whois', 'total')
+SEO_TEXT_FIELDS = ('title', 'description', 'keywords', 'og_title', 'og_description', 'og_image', 'og_url',
+                   'twitter_card', 'twitter_title', 'twitter_description', 'twitter_image', 'canonical', 'robots')
+# Values that repeat across many results and are worth sharing
+_INTERNED = ('twitter_card', 'robots')
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'  # domain.DATE_FORMAT
+COLUMNAR_FORMATS = ('parquet', 'arrow', 'csv')
+EXTENSIONS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.csv': 'csv'}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _timestamp(value):
+    """Unix seconds for a domain info date string ("Unknown" and unparsable ones are None)."""
+    if not value or value == "Unknown":
+        return None
+    try:
+        return calendar.timegm(time.strptime(value, _DATE_FORMAT))
+    except ValueError:
+        return None
+
+
+def _date_text(value):
+    return "Unknown" if value is None else time.strftime(_DATE_FORMAT, time.gmtime(value))
+
+
+@dataclass(slots=True)
+class SeoInfo:
+    title: str = None
+    description: str = None
+    keywords: str = None
+    og_title: str = None
+    og_description: str = None
+    og_image: str = None
+    og_url: str = None
+    twitter_card: str = None
+    twitter_title: str = None
+    twitter_description: str = None
+    twitter_image: str = None
+    canonical: str = None
+    robots: str = None
+    h1_tags: tuple = ()
+    images_without_alt: int = 0
+    total_images: int = 0
+    seo_score: int = None
+    seo_grade: str = None
+
+    @classmethod
+    def from_dict(cls, seo):
+        info = cls(**{field: seo.get(field) for field in SEO_TEXT_FIELDS})
+        for field in _INTERNED:
+            setattr(info, field, _intern(getattr(info, field)))
+        info.h1_tags = tuple(seo.get('h1_tags') or ())
+        info.images_without_alt = seo.get('images_without_alt') or 0
+        info.total_images = seo.get('total_images') or 0
+        info.seo_score = seo.get('seo_score')
+        info.seo_grade = _intern(seo.get('seo_grade'))
+        return info
+
+    def to_dict(self):
+        seo = {field: getattr(self, field) for field in SEO_TEXT_FIELDS}
+        seo['h1_tags'] = list(self.h1_tags)
+        seo['images_without_alt'] = self.images_without_alt
+        seo['total_images'] = self.total_images
+        if self.seo_score is not None:
+            seo['seo_score'] = self.seo_score
+            seo['seo_grade'] = self.seo_grade
+        return seo
+
+
+@dataclass(slots=True)
+class DomainInfo:
+    domain: str
+    registrar: str = None
+    registered_on: float = None
+    expires_on: float = None
+    updated_on: float = None
+
+    @classmethod
+    def from_dict(cls, info):
+        registrar = info.get('registrar')
+        return cls(domain=info.get('domain'), registrar=_intern(None if registrar == "Unknown" else registrar),
+                   registered_on=_timestamp(info.get('registered_on')), expires_on=_timestamp(info.get('expires_on')),
+                   updated_on=_timestamp(info.get('updated_on')))
+
+    def to_dict(self):
+        return {"domain": self.domain, "registrar": self.registrar or "Unknown",
+                "registered_on": _date_text(self.registered_on), "expires_on": _date_text(self.expires_on),
+                "updated_on": _date_text(self.updated_on)}
+
+
+@dataclass(slots=True)
+class CheckResult:
+    url: str
+    status: str
+    status_code: int = None
+    duration_ms: float = None
+    checked_at: float = None
+    reused: bool = False
+    timings: tuple = ()  # ms per STAGES entry, None where a stage didn't happen
+    seo: SeoInfo = None
+    domain: DomainInfo = None
+
+    @classmethod
+    def from_dict(cls, result, checked_at=None):
+        """From a check_url result dict; checked_at defaults to now."""
+        status = result.get('status') or ''
+        status_code = None
+        if status.startswith('Working ('):
+            status_code = int(status[len('Working ('):-1])
+        timings = result.get('timings') or {}
+        seo = result.get('seo')
+        info = result.get('domain_info')
+        return cls(url=result.get('url'), status=sys.intern(status), status_code=status_code,
+                   duration_ms=timings.get('total_ms'), checked_at=time.time() if checked_at is None else checked_at,
+                   reused=bool(result.get('reused')), timings=tuple(timings.get(f"{stage}_ms") for stage in STAGES),
+                   seo=SeoInfo.from_dict(seo) if seo and 'seo_score' in seo else None,
+                   domain=DomainInfo.from_dict(info) if info else None)
+
+    def to_dict(self):
+        """The check_url dict shape (for JSON output)."""
+        timings = dict(zip((f"{stage}_ms" for stage in STAGES), self.timings))
+        return {"url": self.url, "status": self.status,
+                "domain_info": self.domain.to_dict() if self.domain else {},
+                "seo": self.seo.to_dict() if self.seo else {"title": None, "description": None, "keywords": None},
+                "duration": f"{(self.duration_ms or 0) / 1000:.2f}s", "reused": self.reused, "timings": timings}
+
+    def row(self):
+        """Flat {column: value} row, see COLUMNS."""
+        seo = self.seo or _NO_SEO
+        domain = self.domain or _NO_DOMAIN
+        row = {"url": self.url, "status": self.status, "status_code": self.status_code,
+               "duration_ms": self.duration_ms, "checked_at": self.checked_at, "reused": self.reused}
+        row.update(zip((f"{stage}_ms" for stage in STAGES), self.timings or (None,) * len(STAGES)))
+        row.update(domain=domain.domain, registrar=domain.registrar, registered_on=domain.registered_on,
+                   expires_on=domain.expires_on, updated_on=domain.updated_on)
+        for field in SEO_TEXT_FIELDS:
+            row[field] = getattr(seo, field)
+        row.update(h1_tags=list(seo.h1_tags), images_without_alt=seo.images_without_alt,
+                   total_images=seo.total_images, seo_score=seo.seo_score, seo_grade=seo.seo_grade)
+        return row
+
+
+_NO_SEO = SeoInfo()
+_NO_DOMAIN = DomainInfo(domain=None)
+
+# (column, type) of CheckResult.row(); types are pyarrow type factory names
+COLUMNS = ([('url', 'string'), ('status', 'string'), ('status_code', 'int16'), ('duration_ms', 'float64'),
+            ('checked_at', 'float64'), ('reused', 'bool_')]
+           + [(f"{stage}_ms", 'float64') for stage in STAGES]
+           + [('domain', 'string'), ('registrar', 'string'), ('registered_on', 'float64'),
+              ('expires_on', 'float64'), ('updated_on', 'float64')]
+           + [(field, 'string') for field in SEO_TEXT_FIELDS]
+           + [('h1_tags', 'list_of_string'), ('images_without_alt', 'int32'), ('total_images', 'int32'),
+              ('seo_score', 'int16'), ('seo_grade', 'string')])
+
+
+def format_for_path(path, default='csv'):
+    """Export format implied by a file name's extension."""
+    for extension, output_format in EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return output_format
+    return default
+
+
+def _pyarrow():
+    # Optional and heavy: only imported when a Parquet/Arrow file is actually written
+    try:
+        pa = importlib.import_module('pyarrow')
+        importlib.import_module('pyarrow.ipc')
+        importlib.import_module('pyarrow.parquet')
+        return pa
+    except ImportError:
+        return None
+
+
+def columnar_format(requested):
+    """The export format to use for a requested one: CSV when pyarrow isn't installed."""
+    if requested in ('parquet', 'arrow') and _pyarrow() is None:
+        print(f"[export] pyarrow isn't installed; writing CSV instead of {requested}", file=sys.stderr)
+        return 'csv'
+    return requested
+
+
+def _schema(pa, extra):
+    def arrow_type(name):
+        return pa.list_(pa.string()) if name == 'list_of_string' else getattr(pa, name)()
+    return pa.schema([(column, arrow_type(kind)) for column, kind in list(extra) + COLUMNS])
+
+
+class ColumnarWriter:
+    """Writes CheckResult rows to a Parquet, Arrow IPC (stream) or CSV file, buffering
+    `batch_rows` rows at a time (one Parquet row group / Arrow record batch per flush).
+
+    `extra` columns ([(name, type)], e.g. [('index', 'int64')]) come first; pass their values to
+    write(). Use columnar_format() first to fall back to CSV when pyarrow is missing.
+    """
+
+    def __init__(self, path, output_format='parquet', batch_rows=10_000, extra=()):
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(COLUMNAR_FORMATS)}")
+        self._pa = None if output_format == 'csv' else _pyarrow()
+        if output_format != 'csv' and self._pa is None:
+            raise RuntimeError("pyarrow is not installed")
+        self.path = path
+        self.format = output_format
+        self.batch_rows = max(1, batch_rows)
+        self.extra = list(extra)
+        self.names = [column for column, _ in self.extra + COLUMNS]
+        self.rows = 0
+        self._buffer = {name: [] for name in self.names}
+        self._buffered = 0
+        self._writer = None
+        self._file = None
+        if output_format == 'csv':
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.names)
+        else:
+            self._schema = _schema(self._pa, self.extra)
+
+    def write(self, result, **extra):
+        row = result.row()
+        row.update(extra)
+        for name in self.names:
+            self._buffer[name].append(row.get(name))
+        self._buffered += 1
+        self.rows += 1
+        if self._buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffered:
+            return
+        if self.format == 'csv':
+            columns = [self._buffer[name] for name in self.names]
+            h1 = self.names.index('h1_tags')
+            for values in zip(*columns):
+                values = list(values)
+                values[h1] = '; '.join(values[h1] or ())
+                self._writer.writerow(values)
+        else:
+            pa = self._pa
+            batch = pa.record_batch([self._buffer[name] for name in self.names], schema=self._schema)
+            if self._writer is None:
+                self._writer = (pa.parquet.ParquetWriter(self.path, self._schema) if self.format == 'parquet'
+                                else pa.ipc.new_stream(self.path, self._schema))
+            self._writer.write_batch(batch)
+        for values in self._buffer.values():
+            values.clear()
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        if self.format == 'csv':
+            self._file.close()
+        else:
+            if self._writer is None:
+                # Nothing was written: still leave a valid, empty file
+                self._writer = (self._pa.parquet.ParquetWriter(self.path, self._schema) if self.format == 'parquet'
+                                else self._pa.ipc.new_stream(self.path, self._schema))
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
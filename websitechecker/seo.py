@@ -0,0 +1,422 @@
+from html.entities import html5
+from html.parser import HTMLParser
+
+# The parser below mirrors how BeautifulSoup's html.parser tree builder sees a page, so
+# results match what the old soup.find()-based extractor returned, in a single pass.
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer',
+}
+# Text inside these isn't page text (BeautifulSoup's get_text() skips it)
+STRING_CONTAINERS = {'rt', 'rp', 'style', 'script', 'template'}
+PRESERVE_WHITESPACE = {'pre', 'textarea'}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+# (result key, attribute, value, case-insensitive) for the <meta> tags we read; first match wins
+META_FIELDS = (
+    ('description', 'name', 'description', True),
+    ('og_description_fallback', 'property', 'og:description', True),
+    ('keywords', 'name', 'keywords', True),
+    ('og_title', 'property', 'og:title', False),
+    ('og_description', 'property', 'og:description', False),
+    ('og_image', 'property', 'og:image', False),
+    ('og_url', 'property', 'og:url', False),
+    ('twitter_card', 'name', 'twitter:card', False),
+    ('twitter_title', 'name', 'twitter:title', False),
+    ('twitter_description', 'name', 'twitter:description', False),
+    ('twitter_image', 'name', 'twitter:image', False),
+    ('robots', 'name', 'robots', False),
+)
+
+# <link rel> values whose href is an origin to connect to early, not something to fetch
+RESOURCE_HINTS = {'preconnect', 'dns-prefetch'}
+
+_entities = None
+
+
+def _entity(name):
+    global _entities
+    if _entities is None:
+        _entities = {}
+        for name_with_semicolon, character in sorted(html5.items()):
+            _entities.setdefault(name_with_semicolon[:-1] if name_with_semicolon.endswith(';')
+                                 else name_with_semicolon, character)
+    return _entities.get(name)
+
+
+def _matches(value, expected, case_insensitive):
+    if value is None:
+        return False
+    if case_insensitive:
+        # same as re.search(r'^expected$', value, re.I)
+        value = value.lower()
+        return value == expected or value == expected + '\n'
+    return value == expected
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class SeoParser(HTMLParser):
+    """Collects title, meta/OG/Twitter tags, canonical, h1s and image alt stats in one pass.
+
+    Feed it the page (in one go or chunk by chunk), then call close() and result(). With
+    head_only=True parsing stops as soon as the <head> is over, and h1/image stats stay empty.
+    With collect_links=True the href of every <a> is kept in `links` (as written, not resolved);
+    with collect_resources=True `resources` gets (tag, url) for every <img src>, <script src> and
+    <link href> (except preconnect/dns-prefetch hints, which name an origin, not a resource).
+    """
+
+    def __init__(self, head_only=False, collect_links=False, collect_resources=False):
+        super().__init__(convert_charrefs=False)
+        self.head_only = head_only
+        self.collect_links = collect_links
+        self.collect_resources = collect_resources
+        self.links = []
+        self.resources = []
+        self.head_complete = False
+        self.done = False
+        # Open elements: [name, h1 text parts or None, children or None (only under <title>)]
+        self._stack = []
+        self._containers = 0
+        self._preserve = 0
+        self._open_h1s = 0
+        self._already_closed = {}
+        self._text = []
+        self._title = None
+        self._meta = {}
+        self._canonical = None
+        self._h1s = []
+        self.total_images = 0
+        self.images_without_alt = 0
+
+    # --- input ---
+    def feed(self, data):
+        if self.done:
+            return
+        try:
+            super().feed(data)
+        except _StopParsing:
+            self.done = True
+
+    def close(self):
+        if not self.done:
+            try:
+                super().close()
+            except _StopParsing:
+                pass
+        self._end_data()
+        self.done = True
+
+    # --- tree bookkeeping ---
+    def _end_data(self, kind='text'):
+        if not self._text:
+            return
+        data = ''.join(self._text)
+        self._text = []
+        if not self._preserve and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        if self._stack and self._stack[-1][2] is not None:
+            self._stack[-1][2].append(data)
+        # Only plain text (or CDATA) outside script/style/... counts towards h1 text
+        if self._open_h1s and (kind == 'text' and self._containers == 0 or kind == 'cdata'):
+            for entry in self._stack:
+                if entry[1] is not None:
+                    entry[1].append(data)
+
+    def _finish_head(self):
+        self.head_complete = True
+        if self.head_only:
+            raise _StopParsing()
+
+    def _push(self, name):
+        parent = self._stack[-1] if self._stack else None
+        entry = [name, None, None]
+        if name == 'title' and self._title is None:
+            entry[2] = []
+            self._title = entry
+        elif parent is not None and parent[2] is not None:
+            entry[2] = []
+            parent[2].append(entry)
+        if name == 'h1':
+            entry[1] = []
+            self._h1s.append(entry)
+            self._open_h1s += 1
+        if name in STRING_CONTAINERS:
+            self._containers += 1
+        if name in PRESERVE_WHITESPACE:
+            self._preserve += 1
+        self._stack.append(entry)
+
+    def _pop_to(self, name):
+        if not any(entry[0] == name for entry in self._stack):
+            return
+        while self._stack:
+            entry = self._stack.pop()
+            if entry[1] is not None:
+                self._open_h1s -= 1
+            if entry[0] in STRING_CONTAINERS:
+                self._containers -= 1
+            if entry[0] in PRESERVE_WHITESPACE:
+                self._preserve -= 1
+            if entry[0] == name:
+                return
+
+    # --- HTMLParser events ---
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        self._end_data()
+        if tag == 'body' and not self.head_complete:
+            self._finish_head()
+
+        attrs = {key: '' if value is None else value for key, value in attrs}
+        if tag == 'meta':
+            for key, attr, expected, case_insensitive in META_FIELDS:
+                if key not in self._meta and _matches(attrs.get(attr), expected, case_insensitive):
+                    self._meta[key] = attrs.get('content')
+        elif tag == 'link':
+            rel = attrs.get('rel', '').split()
+            if self._canonical is None and 'canonical' in rel:
+                self._canonical = attrs
+            if (self.collect_resources and attrs.get('href')
+                    and not RESOURCE_HINTS.intersection(value.lower() for value in rel)):
+                self.resources.append(('link', attrs['href']))
+        elif tag == 'img':
+            self.total_images += 1
+            if 'alt' not in attrs:
+                self.images_without_alt += 1
+            if self.collect_resources and attrs.get('src'):
+                self.resources.append(('img', attrs['src']))
+        elif tag == 'script':
+            if self.collect_resources and attrs.get('src'):
+                self.resources.append(('script', attrs['src']))
+        elif tag == 'a' and self.collect_links and 'href' in attrs:
+            self.links.append(attrs['href'])
+
+        self._push(tag)
+        if tag in VOID_ELEMENTS and handle_empty_element:
+            # Closed straight away; a later explicit </tag> is then swallowed (see handle_endtag)
+            self._pop_to(tag)
+            self._already_closed[tag] = self._already_closed.get(tag, 0) + 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._already_closed.get(tag):
+            # Redundant end tag for a void element: ignored without ending the current text
+            self._already_closed[tag] -= 1
+            return
+        self._end_data()
+        self._pop_to(tag)
+        if tag == 'head' and not self.head_complete:
+            self._finish_head()
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith(('x', 'X')):
+            code = int(name.lstrip('xX'), 16)
+        else:
+            code = int(name)
+        data = None
+        if code < 256:
+            # Numeric refs below 256 are often meant as Windows-1252 (e.g. &#147;)
+            try:
+                data = bytearray([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name):
+        character = _entity(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data):
+        self._end_data()
+        self._text.append(data)
+        self._end_data('comment')
+
+    def handle_decl(self, data):
+        self._end_data()
+        self._text.append(data[len("DOCTYPE "):])
+        self._end_data('decl')
+
+    def unknown_decl(self, data):
+        self._end_data()
+        kind = 'decl'
+        if data.upper().startswith('CDATA['):
+            kind = 'cdata'
+            data = data[len('CDATA['):]
+        self._text.append(data)
+        self._end_data(kind)
+
+    def handle_pi(self, data):
+        self._end_data()
+        self._text.append(data)
+        self._end_data('pi')
+
+    # --- output ---
+    def _title_string(self):
+        node = self._title
+        # Like Tag.string: only defined when there is exactly one child
+        while node is not None:
+            children = node[2]
+            if len(children) != 1:
+                return None
+            if isinstance(children[0], str):
+                return children[0]
+            node = children[0]
+        return None
+
+    def result(self):
+        def content(key):
+            return (self._meta.get(key) or '').strip() or None
+
+        # Basic SEO
+        page_title = None
+        title_string = self._title_string()
+        if title_string:
+            page_title = title_string.strip()
+
+        description = None
+        if 'description' in self._meta:
+            description = content('description')
+        elif 'og_description_fallback' in self._meta:
+            description = content('og_description_fallback')
+
+        canonical = None
+        if self._canonical is not None:
+            canonical = (self._canonical.get('href') or '').strip() or None
+
+        h1_tags = [text for text in (''.join(entry[1]).strip() for entry in self._h1s) if text]
+
+        fields = {
+            'title': page_title,
+            'description': description,
+            'keywords': content('keywords'),
+            'og_title': content('og_title'),
+            'og_description': content('og_description'),
+            'og_image': content('og_image'),
+            'og_url': content('og_url'),
+            'twitter_card': content('twitter_card'),
+            'twitter_title': content('twitter_title'),
+            'twitter_description': content('twitter_description'),
+            'twitter_image': content('twitter_image'),
+            'canonical': canonical,
+            'robots': content('robots'),
+            'h1_tags': h1_tags,
+            'images_without_alt': self.images_without_alt,
+            'total_images': self.total_images,
+        }
+        fields['seo_score'] = score_seo(fields)
+        fields['seo_grade'] = get_seo_grade(fields['seo_score'])
+        return fields
+
+
+def empty_seo():
+    return {
+        'title': None,
+        'description': None,
+        'keywords': None,
+        'og_title': None,
+        'og_description': None,
+        'og_image': None,
+        'og_url': None,
+        'twitter_card': None,
+        'twitter_title': None,
+        'twitter_description': None,
+        'twitter_image': None,
+        'canonical': None,
+        'robots': None,
+        'h1_tags': [],
+        'images_without_alt': 0,
+        'total_images': 0,
+        'seo_score': 0,
+        'seo_grade': 'F'
+    }
+
+
+def extract_seo_from_html(html: str, head_only: bool = False) -> dict:
+    """Extracts comprehensive SEO info from an HTML page."""
+    try:
+        parser = SeoParser(head_only=head_only)
+        parser.feed(html)
+        parser.close()
+        return parser.result()
+    except Exception:
+        return empty_seo()
+
+
+def extract_seo_from_bytes(body: bytes, encoding: str = 'utf-8', head_only: bool = False) -> dict:
+    """extract_seo_from_html for a raw page body (what the parse process pool is handed)."""
+    return extract_seo_from_html(body.decode(encoding or 'utf-8', errors='replace'), head_only)
+
+
+def score_seo(seo):
+    """SEO score (0-100) for an extracted SEO dict."""
+    seo_score = 0
+    page_title = seo['title']
+    description = seo['description']
+    total_images = seo['total_images']
+
+    # Title (20 points)
+    if page_title and len(page_title) >= 30 and len(page_title) <= 60:
+        seo_score += 20
+    elif page_title:
+        seo_score += 10
+
+    # Description (20 points)
+    if description and len(description) >= 120 and len(description) <= 160:
+        seo_score += 20
+    elif description:
+        seo_score += 10
+
+    # H1 Tags (15 points)
+    if seo['h1_tags']:
+        seo_score += 15
+
+    # Canonical URL (10 points)
+    if seo['canonical']:
+        seo_score += 10
+
+    # Open Graph (15 points)
+    if seo['og_title'] and seo['og_description']:
+        seo_score += 15
+    elif seo['og_title'] or seo['og_description']:
+        seo_score += 8
+
+    # Twitter Cards (10 points)
+    if seo['twitter_card']:
+        seo_score += 10
+
+    # Images with Alt (10 points)
+    if total_images > 0:
+        alt_ratio = (total_images - seo['images_without_alt']) / total_images
+        seo_score += int(10 * alt_ratio)
+
+    return seo_score
+
+
+def get_seo_grade(score):
+    """Convert SEO score to letter grade."""
+    if score >= 90:
+        return 'A+'
+    elif score >= 80:
+        return 'A'
+    elif score >= 70:
+        return 'B'
+    elif score >= 60:
+        return 'C'
+    elif score >= 50:
+        return 'D'
+    else:
+        return 'F'
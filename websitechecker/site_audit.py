@@ -0,0 +1,224 @@
+import hashlib
+import os
+
+from .crawler import CRAWL_CONCURRENCY, iter_crawl
+
+# Example URLs kept per finding (a duplicate title, a broken link, a missing tag)
+AUDIT_SAMPLE_URLS = int(os.getenv('AUDIT_SAMPLE_URLS', '10'))
+# Duplicate groups / broken link targets listed in the summary; further ones are only counted
+AUDIT_MAX_FINDINGS = int(os.getenv('AUDIT_MAX_FINDINGS', '1000'))
+# Linked-but-not-yet-crawled targets remembered for the broken link check
+AUDIT_MAX_PENDING_LINKS = int(os.getenv('AUDIT_MAX_PENDING_LINKS', '200000'))
+
+# seo_score histogram buckets: 0-9, 10-19, ..., 90-100
+_SCORE_BUCKETS = [f"{low}-{low + 9}" for low in range(0, 90, 10)] + ['90-100']
+_MISSING_FIELDS = ('title', 'description', 'canonical', 'h1')
+_NOT_CRAWLED = object()
+
+
+def _digest(text):
+    # Keys the value by 8 bytes instead of the value itself
+    return hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=8).digest()
+
+
+def _is_broken(status):
+    return status is None or status >= 400
+
+
+class _Duplicates:
+    """Finds values (titles, descriptions) shared by several pages.
+
+    Values are keyed by their digest; the value text itself is only kept for the listed groups.
+    Each distinct value still costs a digest plus the URL of the first page that had it.
+    """
+
+    def __init__(self, sample_urls, max_groups):
+        self.sample_urls = sample_urls
+        self.max_groups = max_groups
+        self._first = {}  # digest -> first URL seen with it (None once it's an unlisted duplicate)
+        self._groups = {}  # digest -> {"value", "count", "urls"}
+        self.groups = 0
+        self.pages = 0
+
+    def add(self, value, url):
+        if not value:
+            return
+        key = _digest(value)
+        group = self._groups.get(key)
+        if group is not None:
+            group['count'] += 1
+            if len(group['urls']) < self.sample_urls:
+                group['urls'].append(url)
+            self.pages += 1
+            return
+        if key not in self._first:
+            self._first[key] = url
+            return
+        first = self._first[key]
+        if first is None:
+            # Already counted as a duplicate group, just not listed
+            self.pages += 1
+            return
+        self.groups += 1
+        self.pages += 2
+        if len(self._groups) < self.max_groups:
+            self._groups[key] = {"value": value, "count": 2, "urls": [first, url][:max(self.sample_urls, 1)]}
+        self._first[key] = None
+
+    def result(self):
+        examples = sorted(self._groups.values(), key=lambda g: -g['count'])
+        return {"groups": self.groups, "pages": self.pages, "examples": examples}
+
+
+class SiteAudit:
+    """Site-wide SEO findings, built one crawled page at a time.
+
+    Feed it the pages of iter_crawl(..., seo=True) with add(); result() summarizes what it has
+    seen so far. Memory grows with the number of crawled pages: each page's URL and status are kept
+    (to tell whether links found later point at a broken page), as are a digest and a first URL for
+    every distinct title and description. Page titles, descriptions and SEO data aren't kept, links
+    to pages not crawled yet are capped by AUDIT_MAX_PENDING_LINKS, and everything listed in the
+    summary is capped by AUDIT_SAMPLE_URLS / AUDIT_MAX_FINDINGS.
+    """
+
+    def __init__(self, sample_urls=AUDIT_SAMPLE_URLS, max_findings=AUDIT_MAX_FINDINGS,
+                 max_pending=AUDIT_MAX_PENDING_LINKS):
+        self.sample_urls = sample_urls
+        self.max_findings = max_findings
+        self.max_pending = max_pending
+        self.pages = 0
+        self.html_pages = 0
+        self.statuses = {}
+        self.titles = _Duplicates(sample_urls, max_findings)
+        self.descriptions = _Duplicates(sample_urls, max_findings)
+        self.missing = {field: {"count": 0, "urls": []} for field in _MISSING_FIELDS}
+        self.score_histogram = dict.fromkeys(_SCORE_BUCKETS, 0)
+        self.grades = {}
+        self.score_total = 0
+        self.total_images = 0
+        self.images_without_alt = 0
+        self._status = {}  # crawled URL -> status
+        self._pending = {}  # linked URL not crawled (yet) -> [link count, referrers]
+        self._untracked_links = 0
+        self._broken = {}  # broken target URL -> {"url", "status", "links", "referrers"}
+        self._unlisted_broken = set()  # broken targets past max_findings, only counted
+        self.broken_targets = 0
+        self.broken_links = 0
+
+    def add(self, page):
+        """Adds one crawled page ({"url", "status", "seo", "links"})."""
+        url, status = page['url'], page['status']
+        self.pages += 1
+        key = str(status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        self._status[url] = status
+
+        # Links to this page found before it was crawled
+        pending = self._pending.pop(url, None)
+        if pending and _is_broken(status):
+            self._broken_link(url, status, pending[1], count=pending[0])
+
+        seo = page.get('seo')
+        if seo:
+            self._add_seo(url, seo)
+
+        for link in page.get('links') or ():
+            if link == url:
+                continue
+            target_status = self._status.get(link, _NOT_CRAWLED)
+            if target_status is _NOT_CRAWLED:
+                entry = self._pending.get(link)
+                if entry is None:
+                    if len(self._pending) >= self.max_pending:
+                        self._untracked_links += 1
+                        continue
+                    entry = self._pending[link] = [0, []]
+                entry[0] += 1
+                if len(entry[1]) < self.sample_urls:
+                    entry[1].append(url)
+            elif _is_broken(target_status):
+                self._broken_link(link, target_status, [url])
+
+    def _add_seo(self, url, seo):
+        self.html_pages += 1
+        self.titles.add(seo.get('title'), url)
+        self.descriptions.add(seo.get('description'), url)
+        present = {'title': seo.get('title'), 'description': seo.get('description'),
+                   'canonical': seo.get('canonical'), 'h1': seo.get('h1_tags')}
+        for field, value in present.items():
+            if not value:
+                missing = self.missing[field]
+                missing['count'] += 1
+                if len(missing['urls']) < self.sample_urls:
+                    missing['urls'].append(url)
+
+        score = seo.get('seo_score') or 0
+        self.score_total += score
+        self.score_histogram[_SCORE_BUCKETS[min(score // 10, 9)]] += 1
+        grade = seo.get('seo_grade')
+        self.grades[grade] = self.grades.get(grade, 0) + 1
+        self.total_images += seo.get('total_images') or 0
+        self.images_without_alt += seo.get('images_without_alt') or 0
+
+    def _broken_link(self, target, status, referrers, count=1):
+        self.broken_links += count
+        entry = self._broken.get(target)
+        if entry is None:
+            if target in self._unlisted_broken:
+                return
+            self.broken_targets += 1
+            if len(self._broken) >= self.max_findings:
+                self._unlisted_broken.add(target)
+                return
+            entry = self._broken[target] = {"url": target, "status": status, "links": 0, "referrers": []}
+        entry['links'] += count
+        for referrer in referrers:
+            if referrer not in entry['referrers'] and len(entry['referrers']) < self.sample_urls:
+                entry['referrers'].append(referrer)
+
+    def result(self):
+        """The audit summary so far."""
+        return {
+            "pages": self.pages,
+            "html_pages": self.html_pages,
+            "statuses": self.statuses,
+            "duplicates": {"title": self.titles.result(), "description": self.descriptions.result()},
+            "missing": self.missing,
+            "seo_score": {
+                "mean": round(self.score_total / self.html_pages, 1) if self.html_pages else None,
+                "histogram": self.score_histogram,
+                "grades": self.grades,
+            },
+            "images": {"total": self.total_images, "without_alt": self.images_without_alt},
+            "broken_links": {
+                "targets": self.broken_targets,
+                "links": self.broken_links,
+                "examples": sorted(self._broken.values(), key=lambda e: -e['links']),
+            },
+            # Linked pages the crawl never fetched (past max_pages/max_depth/time_budget, or robots.txt)
+            "unchecked_links": {"targets": len(self._pending) + self._untracked_links},
+        }
+
+
+async def iter_audit(start_url, max_pages=50, max_depth=None, time_budget=None,
+                     concurrency=CRAWL_CONCURRENCY, engine=None):
+    """Crawls a site and audits it in the same pass.
+
+    Yields each crawled page ({"url", "depth", "status", "seo"}) as it's fetched, then
+    {"summary": SiteAudit.result()} once the crawl ends.
+    """
+    audit = SiteAudit()
+    async for page in iter_crawl(start_url, max_pages, max_depth, time_budget, concurrency, engine, seo=True):
+        audit.add(page)
+        del page['links']
+        yield page
+    yield {"summary": audit.result()}
+
+
+async def audit_site(start_url, max_pages=50, max_depth=None, time_budget=None,
+                     concurrency=CRAWL_CONCURRENCY, engine=None):
+    """Crawls and audits a site, returning only the summary."""
+    summary = None
+    async for item in iter_audit(start_url, max_pages, max_depth, time_budget, concurrency, engine):
+        summary = item.get('summary', summary)
+    return summary
@@ -0,0 +1,121 @@
+import gzip
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+# Protocol limits per sitemap file (uncompressed size)
+MAX_URLS_PER_SITEMAP = 50000
+MAX_BYTES_PER_SITEMAP = 50 * 1024 * 1024
+
+URLSET_HEADER = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+URLSET_FOOTER = '</urlset>\n'
+INDEX_HEADER = f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+INDEX_FOOTER = '</sitemapindex>\n'
+
+_XML_ENTITIES = {'"': '&quot;', "'": '&apos;'}
+
+
+def today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def url_entry(loc, lastmod=None):
+    entry = f'  <url>\n    <loc>{escape(loc, _XML_ENTITIES)}</loc>\n'
+    if lastmod:
+        entry += f'    <lastmod>{lastmod}</lastmod>\n'
+    return entry + '  </url>\n'
+
+
+def iter_urlset(urls, lastmod=None):
+    """Yields a <urlset> document chunk by chunk, stopping at the per-file URL and size limits."""
+    lastmod = lastmod or today()
+    size = len(URLSET_HEADER) + len(URLSET_FOOTER)
+    count = 0
+    yield URLSET_HEADER
+    for loc in urls:
+        entry = url_entry(loc, lastmod)
+        size += len(entry.encode('utf-8'))
+        count += 1
+        if count > MAX_URLS_PER_SITEMAP or size > MAX_BYTES_PER_SITEMAP:
+            print(f"[sitemap] single sitemap limit reached, dropping URLs after {count - 1}", file=sys.stderr)
+            break
+        yield entry
+    yield URLSET_FOOTER
+
+
+def gzip_chunks(chunks):
+    """Gzip-compresses a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class SitemapIndexWriter:
+    """Writes URLs into gzip-compressed sitemap shards plus a sitemap index that lists them.
+
+    A new shard is started whenever the current one would exceed 50,000 URLs or 50 MB, so
+    only the shard being written is ever open.
+    """
+
+    def __init__(self, directory, base_url, lastmod=None, index_name='sitemap_index.xml'):
+        self.directory = directory
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.lastmod = lastmod or today()
+        self.index_name = index_name
+        self.files = []
+        self.url_count = 0
+        self._shard = None
+        self._shard_urls = 0
+        self._shard_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_shard(self):
+        name = f"sitemap-{len(self.files) + 1}.xml.gz"
+        self.files.append(name)
+        self._shard = gzip.open(os.path.join(self.directory, name), 'wt', encoding='utf-8')
+        self._shard.write(URLSET_HEADER)
+        self._shard_urls = 0
+        self._shard_bytes = len(URLSET_HEADER) + len(URLSET_FOOTER)
+
+    def _close_shard(self):
+        if self._shard is not None:
+            self._shard.write(URLSET_FOOTER)
+            self._shard.close()
+            self._shard = None
+
+    def add(self, loc):
+        entry = url_entry(loc, self.lastmod)
+        entry_bytes = len(entry.encode('utf-8'))
+        if self._shard is not None and (self._shard_urls >= MAX_URLS_PER_SITEMAP
+                                        or self._shard_bytes + entry_bytes > MAX_BYTES_PER_SITEMAP):
+            self._close_shard()
+        if self._shard is None:
+            self._open_shard()
+        self._shard.write(entry)
+        self._shard_urls += 1
+        self._shard_bytes += entry_bytes
+        self.url_count += 1
+
+    def close(self):
+        """Finishes the last shard and writes the index. Returns the index path."""
+        self._close_shard()
+        index_path = os.path.join(self.directory, self.index_name)
+        with open(index_path, 'w', encoding='utf-8') as index:
+            index.write(INDEX_HEADER)
+            for name in self.files:
+                index.write(f'  <sitemap>\n    <loc>{escape(self.base_url + name, _XML_ENTITIES)}</loc>\n'
+                            f'    <lastmod>{self.lastmod}</lastmod>\n  </sitemap>\n')
+            index.write(INDEX_FOOTER)
+        return index_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()